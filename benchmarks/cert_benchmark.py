@@ -0,0 +1,222 @@
+"""
+Sertifikat chizish va PDF yig'ish tezligini o'lchash.
+
+Har bir generator (GENERATORS_POOL) uchun sun'iy ishtirokchilar ro'yxati
+(10 / 100 / 1000 kishi) bilan ikki yo'l o'lchanadi:
+
+  png   — create_certificate() -> PNG fayllar -> combine_images_to_pdf_sync()
+  page  — render_certificate_page() -> JPEG sahifa -> MultiVolumePdfWriter (botdagi asosiy yo'l)
+
+Natija: sertifikat/soniya, bitta sertifikatning p95 kechikishi, eng yuqori RSS
+va PDF'ning bir sahifasiga to'g'ri keladigan bayt. Internet kerak emas —
+faqat sertifikatlar/ papkasidagi shablon va shriftlar ishlatiladi.
+
+Ishga tushirish (loyiha ildizidan):
+    python benchmarks/cert_benchmark.py
+    python benchmarks/cert_benchmark.py --sizes 10 100 --generators 1 5 --modes page
+    python benchmarks/cert_benchmark.py --json natijalar.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)  # Shablon yo'llari loyiha ildiziga nisbatan yozilgan
+
+from src.handlers.test import combine_images_to_pdf_sync, TELEGRAM_MAX_FILE_SIZE_BYTES  # noqa: E402
+from src.utils.pdf_writer import MultiVolumePdfWriter, PDF_DPI  # noqa: E402
+from src.utils.sertifikat_generator import (  # noqa: E402
+    GENERATORS_POOL, create_certificate, render_certificate_page, clear_render_caches
+)
+
+FIRST_NAMES = [
+    "Abdulloh", "Azizbek", "Bekzod", "Dilshod", "Doniyor", "Elbek", "Farrux", "G'ayrat", "Husniddin",
+    "Islom", "Jahongir", "Javohir", "Jasur", "Laziz", "Mirjalol", "Muhammadali", "Nodirbek", "Otabek",
+    "Oybek", "Sardor", "Shahzod", "Sherzod", "Ulug'bek", "Xurshid", "Zafar", "Asal", "Dilnoza",
+    "Feruza", "Gulnoza", "Hilola", "Kamola", "Madina", "Malika", "Mohinur", "Nargiza", "Nilufar",
+    "O'g'iloy", "Robiya", "Sabina", "Sevara", "Shahnoza", "Shoira", "Zarina", "Zilola", "Yulduz",
+]
+LAST_NAMES = [
+    "Abdullayev", "Aliyev", "Ahmedov", "Bobonazarov", "Ergashev", "Fayzullayev", "G'afurov", "Hasanov",
+    "Ibragimov", "Ismoilov", "Jo'rayev", "Karimov", "Latipov", "Mahmudov", "Mirzayev", "Nazarov",
+    "Normatov", "Olimov", "Qodirov", "Rahimov", "Rustamov", "Saidov", "Salimov", "Sobirov", "Sultonov",
+    "To'xtayev", "Umarov", "Usmonov", "Xolmatov", "Yo'ldoshev", "Yusupov", "Zokirov",
+]
+SUBJECTS = ["Matematika", "Ona tili va adabiyot", "Fizika", "Kimyo", "Biologiya", "Ingliz tili", "Tarix"]
+TEACHERS = ["Fazliddin Yangiboyev", "Abror Bobonazarov", "Gulnora Rahimova"]
+
+
+def make_participants(count: int, seed: int) -> List[Dict]:
+    """Reyting tartibida sun'iy ishtirokchilar (ism, foiz, o'rin)."""
+    rng = random.Random(seed)
+    total_questions = 30
+    scores = sorted((rng.randint(5, total_questions) for _ in range(count)), reverse=True)
+    participants = []
+    for rank, correct in enumerate(scores, 1):
+        # Ba'zi ishtirokchilarda familiya yo'q — bot ham shunday holatlarni ko'radi
+        last_name = rng.choice(LAST_NAMES) if rng.random() > 0.1 else ""
+        participants.append(dict(
+            full_name=f"{rng.choice(FIRST_NAMES)} {last_name}".strip(),
+            result_percent=round(correct / total_questions * 100),
+            rank=rank,
+        ))
+    return participants
+
+
+class RssSampler:
+    """Jarayon RSS'ini fon threadida kuzatadi va o'lchov davomidagi eng yuqori qiymatni beradi."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _current_rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            # /proc yo'q (macOS) — butun jarayon bo'yicha eng yuqori qiymat
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._current_rss())
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def bench_png(generator_id: int, participants: List[Dict], subject: str, teacher: str, work_dir: str) -> Dict:
+    latencies = []
+    paths = []
+    start = time.perf_counter()
+    for participant in participants:
+        t0 = time.perf_counter()
+        path = create_certificate(generator_id, subject=subject, teacher_name=teacher,
+                                  output_dir=work_dir, **participant)
+        latencies.append(time.perf_counter() - t0)
+        if path.startswith("❌"):
+            raise RuntimeError(path)
+        paths.append(path)
+
+    volumes = combine_images_to_pdf_sync(paths, os.path.join(work_dir, "Sertifikatlar.pdf")) or []
+    elapsed = time.perf_counter() - start
+    return dict(elapsed=elapsed, latencies=latencies,
+                pdf_bytes=sum(os.path.getsize(v) for v in volumes), volumes=len(volumes))
+
+
+def bench_page(generator_id: int, participants: List[Dict], subject: str, teacher: str, work_dir: str) -> Dict:
+    latencies = []
+    writer = MultiVolumePdfWriter(os.path.join(work_dir, "Sertifikatlar.pdf"), TELEGRAM_MAX_FILE_SIZE_BYTES,
+                                  dpi=PDF_DPI)
+    start = time.perf_counter()
+    for participant in participants:
+        t0 = time.perf_counter()
+        page = render_certificate_page(generator_id, subject=subject, teacher_name=teacher, **participant)
+        latencies.append(time.perf_counter() - t0)
+        if isinstance(page, str):
+            raise RuntimeError(page)
+        writer.add_jpeg_page(*page)
+
+    volumes = writer.close()
+    elapsed = time.perf_counter() - start
+    return dict(elapsed=elapsed, latencies=latencies,
+                pdf_bytes=sum(os.path.getsize(v) for v in volumes), volumes=len(volumes))
+
+
+BENCHMARKS = {"png": bench_png, "page": bench_page}
+
+
+def run(sizes: List[int], generator_ids: List[int], modes: List[str], seed: int) -> List[Dict]:
+    rows = []
+    for mode in modes:
+        for generator_id in generator_ids:
+            for size in sizes:
+                participants = make_participants(size, seed)
+                rng = random.Random(seed + generator_id)
+                # Har bir o'lchov "sovuq" holatdan boshlanadi: shablon, shrift va so'z kengliklari keshlari bo'sh
+                clear_render_caches()
+                with tempfile.TemporaryDirectory(prefix="cert_bench_") as work_dir, RssSampler() as rss:
+                    result = BENCHMARKS[mode](generator_id, participants, rng.choice(SUBJECTS),
+                                              rng.choice(TEACHERS), work_dir)
+                row = dict(
+                    mode=mode,
+                    generator=generator_id,
+                    participants=size,
+                    certs_per_sec=round(size / result["elapsed"], 2),
+                    p95_ms=round(percentile(result["latencies"], 95) * 1000, 1),
+                    peak_rss_mb=round(rss.peak / 1024 / 1024, 1),
+                    pdf_bytes_per_page=result["pdf_bytes"] // size,
+                    pdf_volumes=result["volumes"],
+                )
+                rows.append(row)
+                print_row(row)
+    return rows
+
+
+COLUMNS = ["mode", "generator", "participants", "certs_per_sec", "p95_ms", "peak_rss_mb",
+           "pdf_bytes_per_page", "pdf_volumes"]
+
+
+def print_header():
+    print(" | ".join(f"{column:>18}" for column in COLUMNS))
+    print("-" * (21 * len(COLUMNS)))
+
+
+def print_row(row: Dict):
+    print(" | ".join(f"{row[column]!s:>18}" for column in COLUMNS), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sertifikat generatorlari uchun benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Ishtirokchilar soni (standart: 10 100 1000)")
+    parser.add_argument("--generators", type=int, nargs="+", default=sorted(GENERATORS_POOL),
+                        help="Generator ID'lari (standart: hammasi)")
+    parser.add_argument("--modes", nargs="+", choices=sorted(BENCHMARKS), default=["png", "page"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Natijalarni JSON faylga yozish")
+    args = parser.parse_args()
+
+    unknown = [gid for gid in args.generators if gid not in GENERATORS_POOL]
+    if unknown:
+        parser.error(f"Noma'lum generator ID: {unknown}")
+
+    print_header()
+    rows = run(args.sizes, args.generators, args.modes, args.seed)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\nNatijalar yozildi: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import logging
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -7,11 +8,35 @@ from aiogram.client.default import DefaultBotProperties
 from config import Config, load_config
 from src.database.base import Base
 from src.database.sign_data import User, ensure_primary_admin
+from src.database.certificate_data import get_most_used_templates
+from src.database.outbox_data import upgrade_outbox_schema
 from src.handlers import registration, test, admin
 from src.handlers.registration import set_default_commands
+from src.utils.outbox_worker import OutboxWorker
+from src.utils.result_digest import ResultDigest
+from src.utils.cert_renderer import CertificateRenderPool
+from src.utils.scratch_space import ScratchSpace
+from src.utils.sertifikat_generator import warm_up_generators, RENDER_PROFILE_PDF, RENDER_PROFILE_PRINT
 
 logger = logging.getLogger(__name__)
 
+
+async def warm_up_popular_templates(session_factory, cert_pool: CertificateRenderPool, limit: int, profiles):
+    """Eng ko'p tanlangan shablonlarni fonda aniqlab, sertifikat jarayonlariga oldindan yuklaydi."""
+    try:
+        async with session_factory() as session:
+            popular_templates = await get_most_used_templates(session, limit)
+        if not popular_templates:
+            return
+        logger.info(f"Shablonlar oldindan yuklanmoqda: {popular_templates}")
+        await cert_pool.warm_up(functools.partial(warm_up_generators, popular_templates, profiles))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Qizdirish ixtiyoriy — xato bo'lsa ham bot odatdagidek ishlayveradi
+        logger.warning(f"Shablonlarni oldindan yuklab bo'lmadi: {e}")
+
+
 async def main():
     import os
     log_dir = "logs"
@@ -42,6 +67,7 @@ async def main():
     async with engine.begin() as conn:
         # DB'dagi barcha jadvallarni yaratadi
         await conn.run_sync(Base.metadata.create_all, checkfirst=True)
+        await upgrade_outbox_schema(conn)
     logger.info("Database setup complete.")
 
     session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
@@ -70,14 +96,48 @@ async def main():
     dp.include_router(test.router)
     dp.include_router(admin.router)
 
+    # Xabarlar navbati (outbox) — qayta ishga tushganda qolgan xabarlardan davom etadi
+    outbox = OutboxWorker(bot, session_factory)
+    outbox.start()
+    result_digest = ResultDigest(outbox)
+    # Vaqtinchalik fayllar: oldingi ishga tushishdan qolganlari tozalanadi
+    scratch = ScratchSpace(config.render.scratch_quota_mb * 1024 * 1024, root=config.render.scratch_dir)
+    scratch.sweep_orphans()
+    cert_pool = CertificateRenderPool(
+        config.render.cert_workers,
+        cache_dir=config.render.cert_cache_dir,
+        cache_max_bytes=config.render.cert_cache_max_mb * 1024 * 1024
+    )
+
+    # Eng ko'p tanlangan shablonlar jarayonlarga fonda oldindan yuklanadi — polling kutmaydi
+    warm_up_task = None
+    if config.render.cert_warmup_templates > 0:
+        profiles = (RENDER_PROFILE_PDF, RENDER_PROFILE_PRINT) if config.render.cert_image_output \
+            else (RENDER_PROFILE_PDF,)
+        warm_up_task = asyncio.create_task(
+            warm_up_popular_templates(session_factory, cert_pool, config.render.cert_warmup_templates, profiles)
+        )
+
     # Botni ishga tushirish
     await bot.delete_webhook(drop_pending_updates=False)
-    await dp.start_polling(
-        bot,
-        session_factory=session_factory,
-        config=config,
-        timeout=60
-    )
+    try:
+        await dp.start_polling(
+            bot,
+            session_factory=session_factory,
+            config=config,
+            outbox=outbox,
+            result_digest=result_digest,
+            cert_pool=cert_pool,
+            scratch=scratch,
+            timeout=60
+        )
+    finally:
+        # Yig'ilib qolgan jamlanmalar navbatga yoziladi — keyingi ishga tushishda yuboriladi
+        await result_digest.flush_all()
+        await outbox.stop()
+        if warm_up_task is not None and not warm_up_task.done():
+            warm_up_task.cancel()
+        cert_pool.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
+import os
 from dataclasses import dataclass
+from typing import Optional
 
 from dotenv import load_dotenv
 
@@ -26,10 +28,34 @@ class DatabaseConfig:
         return f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
 
 
+@dataclass
+class RenderConfig:
+    cert_workers: int  # Sertifikat chizuvchi jarayonlar soni
+    cert_image_output: Optional[str]  # PDF'dan tashqari rasm nusxalar formati: png / jpeg / webp (None — saqlanmaydi)
+    cert_warmup_templates: int  # Ishga tushishda oldindan yuklanadigan eng ko'p tanlangan shablonlar soni (0 — yo'q)
+    cert_cache_dir: str  # Tayyor sertifikatlar keshi papkasi
+    cert_cache_max_mb: int  # Kesh hajmi chegarasi (0 — kesh o'chirilgan)
+    scratch_dir: Optional[str]  # Vaqtinchalik fayllar papkasi (bo'sh — tmpfs yoki ./scratch)
+    scratch_quota_mb: int  # Vaqtinchalik fayllar uchun kvota
+
+
 @dataclass
 class Config:
     tg_bot: TelegramBotConfig
     db: DatabaseConfig  
+    render: RenderConfig
+
+
+def _image_output_format() -> Optional[str]:
+    image_format = (os.getenv("CERT_IMAGE_OUTPUT") or "").strip().lower() or None
+    # Eski sozlama: CERT_PNG_OUTPUT=1
+    if image_format is None and os.getenv("CERT_PNG_OUTPUT", "").lower() in ("1", "true", "yes"):
+        image_format = "png"
+    if image_format == "jpg":
+        image_format = "jpeg"
+    if image_format not in (None, "png", "jpeg", "webp"):
+        raise ValueError(f"CERT_IMAGE_OUTPUT noto'g'ri: {image_format} (png, jpeg yoki webp bo'lishi kerak)")
+    return image_format
 
 
 def load_config() -> Config:
@@ -48,5 +74,15 @@ def load_config() -> Config:
             name=getenv("DB_NAME"),
             user=getenv("DB_USER"),
             password=getenv("DB_PASSWORD"),
+        ),
+        render=RenderConfig(
+            # Ixtiyoriy: berilmasa — protsessor yadrolari soni
+            cert_workers=int(os.getenv("CERT_WORKERS") or os.cpu_count() or 1),
+            cert_image_output=_image_output_format(),
+            cert_warmup_templates=int(os.getenv("CERT_WARMUP_TEMPLATES") or 3),
+            cert_cache_dir=os.getenv("CERT_CACHE_DIR") or "cert_cache",
+            cert_cache_max_mb=int(os.getenv("CERT_CACHE_MAX_MB") or 512),
+            scratch_dir=os.getenv("SCRATCH_DIR") or None,
+            scratch_quota_mb=int(os.getenv("SCRATCH_QUOTA_MB") or 1024),
         )
     )
\ No newline at end of file
@@ -1,4 +1,6 @@
 from . import base
 from . import sign_data
 from . import test_data
-from . import results_data
\ No newline at end of file
+from . import results_data
+from . import outbox_data
+from . import certificate_data
\ No newline at end of file
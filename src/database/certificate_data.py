@@ -0,0 +1,68 @@
+from sqlalchemy import Column, Integer, String, DateTime, select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+
+from src.database.base import Base
+
+
+class CertificateTemplatePreview(Base):
+    __tablename__ = 'certificate_template_previews'
+
+    # Shablon ko'rinishi bir marta yuklanadi, keyin Telegram file_id orqali yuboriladi
+    template_id = Column(Integer, primary_key=True)
+    file_id = Column(String(255), nullable=False)
+    # "hajm:mtime" — shablon rasmi almashtirilsa, eski file_id ishlatilmaydi
+    file_signature = Column(String(64), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<CertificateTemplatePreview(template_id={self.template_id})>"
+
+
+class CertificateTemplateUsage(Base):
+    __tablename__ = 'certificate_template_usage'
+
+    # Har bir shablon necha marta tanlangani — ishga tushishda eng ko'p ishlatilganlari oldindan yuklanadi
+    template_id = Column(Integer, primary_key=True)
+    selection_count = Column(Integer, nullable=False, default=0)
+    last_selected_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<CertificateTemplateUsage(template_id={self.template_id}, count={self.selection_count})>"
+
+
+async def get_template_previews(session: AsyncSession) -> Dict[int, CertificateTemplatePreview]:
+    result = await session.execute(select(CertificateTemplatePreview))
+    return {preview.template_id: preview for preview in result.scalars().all()}
+
+
+async def save_template_preview(session: AsyncSession, template_id: int, file_id: str, file_signature: str) -> None:
+    await session.execute(
+        delete(CertificateTemplatePreview).where(CertificateTemplatePreview.template_id == template_id)
+    )
+    session.add(CertificateTemplatePreview(template_id=template_id, file_id=file_id, file_signature=file_signature))
+    await session.commit()
+
+
+async def record_template_selection(session: AsyncSession, template_id: int) -> None:
+    # Bitta atomar so'rov (upsert): bir vaqtdagi birinchi tanlovlar ham yo'qolmaydi
+    stmt = insert(CertificateTemplateUsage).values(template_id=template_id, selection_count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CertificateTemplateUsage.template_id],
+        set_={
+            'selection_count': CertificateTemplateUsage.selection_count + 1,
+            'last_selected_at': func.now(),
+        }
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def get_most_used_templates(session: AsyncSession, limit: int) -> List[int]:
+    result = await session.execute(
+        select(CertificateTemplateUsage.template_id)
+        .order_by(CertificateTemplateUsage.selection_count.desc(), CertificateTemplateUsage.last_selected_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
@@ -0,0 +1,133 @@
+from sqlalchemy import Column, BigInteger, String, Integer, Text, DateTime, Index, select, update, delete, insert, \
+    func, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from typing import List, Optional, Tuple
+import datetime
+from datetime import timezone
+
+from src.database.base import Base
+
+OUTBOX_PENDING = 'pending'
+OUTBOX_SENT = 'sent'
+OUTBOX_DEAD = 'dead'  # Urinishlar tugagan yoki Telegram rad etgan — boshqa yuborilmaydi
+
+
+class OutboxMessage(Base):
+    __tablename__ = 'outbox'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    chat_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=False)
+    parse_mode = Column(String(16), nullable=True, default='HTML')
+    # Bir guruh xabarlar (masalan, "finish:12345") yetkazilishini kuzatish uchun
+    batch_key = Column(String(64), nullable=True, index=True)
+    status = Column(String(16), nullable=False, default=OUTBOX_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Xatodan keyin keyingi urinish vaqti (eksponensial kutish); NULL — darhol yuborish mumkin
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_outbox_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, chat_id={self.chat_id}, status={self.status})>"
+
+
+async def upgrade_outbox_schema(conn: AsyncConnection) -> None:
+    """create_all mavjud jadvalni o'zgartirmaydi — eski `outbox` jadvaliga yangi ustun qo'shiladi."""
+    await conn.execute(text("ALTER TABLE outbox ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE"))
+
+
+async def enqueue_messages(
+    session: AsyncSession,
+    messages: List[Tuple[int, str]],
+    batch_key: Optional[str] = None,
+    parse_mode: Optional[str] = 'HTML'
+) -> int:
+    if not messages:
+        return 0
+
+    await session.execute(insert(OutboxMessage), [
+        {'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode, 'batch_key': batch_key,
+         'status': OUTBOX_PENDING, 'attempts': 0}
+        for chat_id, text in messages
+    ])
+    await session.commit()
+    return len(messages)
+
+async def get_pending_messages(session: AsyncSession, limit: int) -> List[OutboxMessage]:
+    stmt = select(OutboxMessage).where(
+        OutboxMessage.status == OUTBOX_PENDING,
+        or_(OutboxMessage.next_attempt_at.is_(None), OutboxMessage.next_attempt_at <= func.now())
+    ).order_by(OutboxMessage.id).limit(limit)
+    result = await session.execute(stmt)
+    return result.scalars().all()
+
+async def mark_messages_sent(session: AsyncSession, message_ids: List[int]) -> None:
+    if not message_ids:
+        return
+    stmt = update(OutboxMessage).where(OutboxMessage.id.in_(message_ids)).values(
+        status=OUTBOX_SENT, sent_at=func.now(), attempts=OutboxMessage.attempts + 1
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+async def mark_messages_dead(session: AsyncSession, message_ids: List[int]) -> None:
+    if not message_ids:
+        return
+    stmt = update(OutboxMessage).where(OutboxMessage.id.in_(message_ids)).values(
+        status=OUTBOX_DEAD, next_attempt_at=None, attempts=OutboxMessage.attempts + 1
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+async def schedule_message_retries(
+    session: AsyncSession,
+    messages: List[OutboxMessage],
+    max_attempts: int,
+    base_delay: datetime.timedelta,
+    max_delay: datetime.timedelta
+) -> int:
+    """
+    Yuborilmagan xabarlarni eksponensial kutish bilan qayta navbatga qo'yadi
+    (base_delay, 2x, 4x ... max_delay gacha). `max_attempts` ga yetganlari 'dead' bo'ladi.
+    Qaytaradi: 'dead' deb belgilanganlar soni.
+    """
+    if not messages:
+        return 0
+    now = datetime.datetime.now(timezone.utc)
+    rows = []
+    dead = 0
+    for message in messages:
+        attempts = message.attempts + 1
+        if attempts >= max_attempts:
+            rows.append({'id': message.id, 'attempts': attempts, 'status': OUTBOX_DEAD, 'next_attempt_at': None})
+            dead += 1
+        else:
+            delay = min(base_delay * (2 ** (attempts - 1)), max_delay)
+            rows.append({'id': message.id, 'attempts': attempts, 'next_attempt_at': now + delay})
+    await session.execute(update(OutboxMessage), rows)
+    await session.commit()
+    return dead
+
+async def get_batch_progress(session: AsyncSession, batch_key: str) -> Tuple[int, int]:
+    """Qaytaradi: (yakunlangan — yuborilgan yoki xato, jami)."""
+    stmt = select(
+        func.count().filter(OutboxMessage.status != OUTBOX_PENDING),
+        func.count()
+    ).where(OutboxMessage.batch_key == batch_key)
+    result = await session.execute(stmt)
+    done, total = result.one()
+    return done, total
+
+async def delete_sent_messages_before(session: AsyncSession, before: datetime.datetime) -> int:
+    stmt = delete(OutboxMessage).where(
+        OutboxMessage.status != OUTBOX_PENDING,
+        OutboxMessage.created_at < before
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, BigInteger, String, Integer, select, func, DateTime, desc, asc, delete
+from sqlalchemy import Column, BigInteger, String, Integer, select, func, DateTime, desc, asc, delete, update, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 from src.database.sign_data import User
 from sqlalchemy.future import select
+import numpy as np
 from src.database.base import Base
+from src.database.test_data import invalidate_test_cache
+from src.utils.answer_key import build_answer_matrix, grade_matrix, count_questions
+from src.utils.leaderboard import Leaderboard, get_cached_leaderboard, create_leaderboard, record_result, \
+    drop_leaderboard
 
 class Result(Base):
     __tablename__ = 'results'
@@ -38,6 +43,7 @@ async def add_new_result(
     session.add(new_result)
     await session.commit()
     await session.refresh(new_result)
+    record_result(test_id, new_result.id, user_id, correct_count, total_questions, new_result.created_at)
     return new_result
 
 async def get_test_results_with_users(session: AsyncSession, test_id: str) -> List[Tuple]:
@@ -62,6 +68,50 @@ async def get_test_results_with_users(session: AsyncSession, test_id: str) -> Li
     result = await session.execute(stmt)
     return result.all()
 
+async def get_results_without_user(session: AsyncSession, test_id: int) -> List[Tuple]:
+    """`users` jadvalida yozuvi yo'q ishtirokchilar natijalari: (user_id, correct_count, total_questions, user_answers_key)."""
+    stmt = select(
+        Result.user_id,
+        Result.correct_count,
+        Result.total_questions,
+        Result.user_answers_key,
+    ).outerjoin(
+        User, User.tg_id == Result.user_id
+    ).where(
+        Result.test_id == test_id,
+        User.tg_id.is_(None)
+    ).order_by(
+        desc(Result.correct_count), asc(Result.created_at)
+    )
+
+    result = await session.execute(stmt)
+    return result.all()
+
+async def get_test_leaderboard(session: AsyncSession, test_id: int) -> Leaderboard:
+    """
+    Test reytingini xotiradan qaytaradi; keshda bo'lmasa bir marta bazadan quradi.
+    Keyingi natijalar add_new_result orqali reytingga bevosita qo'shiladi.
+    """
+    board = get_cached_leaderboard(test_id)
+    if board is not None:
+        await board.loaded.wait()
+        return board
+
+    # Reyting keshga oldindan qo'yiladi: so'rov davomida kelgan natijalar ham unga tushadi
+    board = create_leaderboard(test_id)
+    try:
+        stmt = select(
+            Result.id, Result.user_id, Result.correct_count, Result.total_questions, Result.created_at
+        ).where(Result.test_id == test_id)
+        for row in (await session.execute(stmt)).all():
+            board.add(row.id, row.user_id, row.correct_count, row.total_questions, row.created_at)
+    except Exception:
+        drop_leaderboard(test_id)
+        raise
+    finally:
+        board.loaded.set()
+    return board
+
 async def get_unique_user_ids_for_test(session: AsyncSession, test_id: str) -> List[int]:
     stmt = select(Result.user_id).where(Result.test_id == test_id).distinct()
     result = await session.execute(stmt)
@@ -71,6 +121,7 @@ async def delete_results_by_test_id(session: AsyncSession, test_id: str) -> int:
 
     stmt = delete(Result).where(Result.test_id == test_id)
     result = await session.execute(stmt)
+    drop_leaderboard(test_id)
 
     return result.rowcount
 
@@ -82,4 +133,86 @@ async def has_user_completed_test(session: AsyncSession, user_id: int, test_id:
         Result.test_id == test_id
     )
     result = await session.execute(stmt)
-    return result.scalar_one_or_none() is not None
\ No newline at end of file
+    return result.scalar_one_or_none() is not None
+
+
+async def regrade_test_results(session: AsyncSession, test_id: int, compiled_key: bytes) -> int:
+    """
+    Testning barcha natijalarini yangi kalit bo'yicha bir o'tishda qayta baholaydi.
+    Javoblar (ishtirokchilar × savollar) matritsasiga yig'iladi va kalit vektori
+    bilan solishtiriladi; o'zgargan qatorlar bitta bulk UPDATE bilan yoziladi.
+    Commit qilinmaydi — kalit bilan birga commit_answer_key_change() orqali yoziladi.
+    Qaytaradi: o'zgartirilgan natijalar soni.
+    """
+    stmt = select(
+        Result.id, Result.user_answers_key, Result.correct_count, Result.total_questions
+    ).where(
+        Result.test_id == test_id,
+        Result.user_answers_key.is_not(None)
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return 0
+
+    answers = build_answer_matrix([row.user_answers_key for row in rows], len(compiled_key))
+    new_counts = grade_matrix(compiled_key, answers)
+    total_questions = count_questions(compiled_key)
+
+    changed = [
+        {'id': row.id, 'correct_count': int(new_count), 'total_questions': total_questions}
+        for row, new_count in zip(rows, new_counts)
+        if row.correct_count != new_count or row.total_questions != total_questions
+    ]
+    if changed:
+        await session.execute(update(Result), changed)
+    return len(changed)
+
+
+async def apply_answer_key_correction(
+    session: AsyncSession,
+    test_id: int,
+    old_key: bytes,
+    changes: Dict[int, str]
+) -> int:
+    """
+    Kalitdagi bir nechta savol tuzatilganda faqat shu savollarning hissasini
+    qayta hisoblaydi: har bir natija uchun delta = (yangi javobga mos) - (eskisiga mos).
+    `old_key` test qatori qulflangan holda o'qilgan bo'lishi kerak (lock_test_for_update);
+    commit qilinmaydi — kalit bilan birga commit_answer_key_change() orqali yoziladi.
+    Qaytaradi: o'zgartirilgan natijalar soni.
+    """
+    stmt = select(Result.id, Result.user_answers_key).where(
+        Result.test_id == test_id,
+        Result.user_answers_key.is_not(None)
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows or not changes:
+        return 0
+
+    questions = sorted(changes)
+    answers = build_answer_matrix([row.user_answers_key for row in rows], len(old_key))[:, questions]
+    old_letters = np.frombuffer(bytes(old_key[q] for q in questions), dtype=np.uint8)
+    new_letters = np.frombuffer(bytes(ord(changes[q]) for q in questions), dtype=np.uint8)
+    deltas = (answers == new_letters).sum(axis=1) - (answers == old_letters).sum(axis=1)
+
+    params = [
+        {'result_id': row.id, 'delta': int(delta)}
+        for row, delta in zip(rows, deltas)
+        if delta
+    ]
+    if params:
+        results_table = Result.__table__
+        stmt = update(results_table).where(
+            results_table.c.id == bindparam('result_id')
+        ).values(
+            correct_count=results_table.c.correct_count + bindparam('delta')
+        )
+        await session.execute(stmt, params)
+    return len(params)
+
+
+async def commit_answer_key_change(session: AsyncSession, test_id: int) -> None:
+    """Yangi kalit va qayta hisoblangan natijalarni birga commit qiladi; keshlar faqat shundan keyin tozalanadi."""
+    await session.commit()
+    drop_leaderboard(test_id)
+    await invalidate_test_cache(test_id)
\ No newline at end of file
@@ -76,6 +76,13 @@ async def get_user(session: AsyncSession, tg_id: int) -> Optional[User]:
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
+async def get_users_by_ids(session: AsyncSession, tg_ids: List[int]) -> Dict[int, User]:
+    if not tg_ids:
+        return {}
+    stmt = select(User).where(User.tg_id.in_(tg_ids))
+    result = await session.execute(stmt)
+    return {user.tg_id: user for user in result.scalars().all()}
+
 async def check_is_admin(session: AsyncSession, tg_id: int) -> bool:
     stmt = select(User.tg_id).where(User.tg_id == tg_id, User.role == True)
     result = await session.execute(stmt)
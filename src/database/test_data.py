@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from src.database.base import Base
+from src.utils.answer_key import compile_answer_key
 
 
 class Test(Base):
@@ -17,10 +18,25 @@ class Test(Base):
     status = Column(Boolean, default=True, nullable=False)
     answer = Column(String, nullable=False) 
     
+    @property
+    def compiled_answer(self) -> bytes:
+        # Kalit bir marta tahlil qilinadi va answer satri bo'yicha keshlanadi
+        return compile_answer_key(self.answer)
+
     def __repr__(self):
         return f"<Test(id={self.id}, title='{self.title}')>"
 
 
+class ResultDigestOptOut(Base):
+    __tablename__ = 'result_digest_optouts'
+
+    # Shu testlar bo'yicha ijodkor har bir natijani alohida xabar sifatida oladi
+    test_id = Column(BigInteger, primary_key=True)
+
+    def __repr__(self):
+        return f"<ResultDigestOptOut(test_id={self.test_id})>"
+
+
 async def add_new_test(
     session: AsyncSession,
     test_id: int,
@@ -49,10 +65,36 @@ async def get_test_by_id(session: AsyncSession, test_id: int) -> Optional[Test]:
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
+async def invalidate_test_cache(test_id: int) -> None:
+    await get_test_by_id.cache.delete(test_id)
+
+async def lock_test_for_update(session: AsyncSession, test_id: int) -> Optional[Test]:
+    """
+    Test qatorini tranzaksiya oxirigacha qulflaydi (SELECT ... FOR UPDATE) va keshsiz,
+    bazadagi eng so'nggi holatini qaytaradi. Kalit o'zgartirilayotganda yangi natijalar
+    kutib turadi (get_test_answer_for_share), shuning uchun ikki marta baholanmaydi.
+    """
+    stmt = select(Test).where(Test.id == test_id).with_for_update().execution_options(populate_existing=True)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+async def get_test_answer_for_share(session: AsyncSession, test_id: int) -> Optional[str]:
+    """Natija saqlanguncha kalit o'zgarmasligi uchun uni SELECT ... FOR SHARE bilan o'qiydi."""
+    stmt = select(Test.answer).where(Test.id == test_id).with_for_update(read=True)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+async def update_test_answer(session: AsyncSession, test_id: int, answer: str) -> bool:
+    # Commit qilinmaydi: kalit natijalarni qayta baholash bilan bitta tranzaksiyada yoziladi
+    stmt = update(Test).where(Test.id == test_id).values(answer=answer)
+    result = await session.execute(stmt)
+    return result.rowcount > 0
+
 async def deactivate_test(session: AsyncSession, test_id: int) -> bool:
     stmt = update(Test).where(Test.id == test_id).values(status=False)
     result = await session.execute(stmt)
     await session.commit()
+    await invalidate_test_cache(test_id)
     return result.rowcount > 0 
 
 async def get_inactive_tests(session: AsyncSession) -> list:
@@ -69,4 +111,18 @@ async def delete_test_by_id(session: AsyncSession, test_id: int) -> bool:
     if result.rowcount > 0:
         return True
     else:
-        return False
\ No newline at end of file
+        return False
+
+
+@cached(ttl=300, key_builder=lambda f, *args, **kwargs: args[1])
+async def is_result_digest_disabled(session: AsyncSession, test_id: int) -> bool:
+    stmt = select(ResultDigestOptOut.test_id).where(ResultDigestOptOut.test_id == test_id)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none() is not None
+
+async def set_result_digest_disabled(session: AsyncSession, test_id: int, disabled: bool) -> None:
+    await session.execute(delete(ResultDigestOptOut).where(ResultDigestOptOut.test_id == test_id))
+    if disabled:
+        session.add(ResultDigestOptOut(test_id=test_id))
+    await session.commit()
+    await is_result_digest_disabled.cache.delete(test_id)
@@ -9,7 +9,9 @@ from src.database.sign_data import check_is_admin, set_admin_status, get_admin_u
 from src.states.admin_state import AdminFSM
 from src.keyboards.admin_btn import adminMenu, setting
 from src.keyboards.mainbtn import mainMenu
+from src.utils.send_scheduler import send_scheduler
 import asyncio
+import functools
 import pandas as pd
 import io
 from io import BytesIO
@@ -187,17 +189,11 @@ async def process_broadcast_message(
 
     await message.answer(f"🔄 Reklama {len(user_ids)} ta foydalanuvchiga yuborish boshlandi...")
 
-    successful_sends = 0
-    failed_sends = 0
-    
-    for target_user_id in user_ids:
-        try:
-            await message.copy_to(chat_id=target_user_id)
-            successful_sends += 1
-            await asyncio.sleep(0.05) 
-
-        except Exception as e:
-            failed_sends += 1
+    # Tezlik cheklovlari umumiy send_scheduler orqali — test hisobotlari bilan bir navbatda
+    successful_sends, failed_sends = await send_scheduler.send_many(
+        (target_user_id, functools.partial(message.copy_to, chat_id=target_user_id))
+        for target_user_id in user_ids
+    )
 
     await message.answer(
         f"✅ Reklama yuborish yakunlandi:\n"
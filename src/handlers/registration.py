@@ -23,6 +23,8 @@ async def set_default_commands(bot: Bot):
         BotCommand(command="new_test", description="➕ Yangi test yaratishni boshlash"),
         BotCommand(command="check_test", description="✅ Testni tekshirish"),
         BotCommand(command="end_test", description="🏆 Testni yakunlash"),
+        BotCommand(command="fix_key", description="✏️ Kalitdagi savolni tuzatish"),
+        BotCommand(command="regrade_test", description="🔁 Kalitni almashtirib qayta baholash"),
         BotCommand(command="menu", description="📄 Asosiy menyu"),
         BotCommand(command="panel", description="Admin panelga kirish")
     ]
@@ -4,30 +4,50 @@ from aiogram.types import (
     Message,
     ReplyKeyboardRemove,
     FSInputFile,
+    BufferedInputFile,
+    InputMediaPhoto,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     CallbackQuery
 )
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 import re
-import shutil
 import random
+from config import Config
 from src.filters.is_subscribed import IsSubscribed
 from src.states.test_creation import TestStates, CheckStates
 from src.keyboards.mainbtn import mainMenu
-from src.database.test_data import add_new_test, get_test_by_id, deactivate_test, Test
-from src.database.results_data import add_new_result, get_test_results_with_users, get_unique_user_ids_for_test, \
-    has_user_completed_test
-from src.database.sign_data import get_user
-from typing import List, Tuple, Any, Callable, Union, Optional
+from src.database.test_data import add_new_test, get_test_by_id, deactivate_test, update_test_answer, Test, \
+    lock_test_for_update, get_test_answer_for_share, \
+    is_result_digest_disabled, set_result_digest_disabled
+from src.database.results_data import add_new_result, get_test_results_with_users, has_user_completed_test, \
+    regrade_test_results, apply_answer_key_correction, commit_answer_key_change, get_test_leaderboard, \
+    get_results_without_user
+from src.database.sign_data import get_user, get_users_by_ids
+from src.database.certificate_data import get_template_previews, save_template_preview, record_template_selection
+from typing import List, Tuple, Any, Callable, Union, Optional, Dict
+from dataclasses import dataclass
 import os
 from src.utils.excel_generator import create_full_participant_report_pandas
-from src.utils.sertifikat_generator import create_certificate
+from src.utils.sertifikat_generator import render_certificate_page, image_file_name, TEMPLATE_MANIFESTS
+from src.utils.cert_renderer import CertificateRenderPool
+from src.utils.scratch_space import ScratchSpace
+from src.utils.pdf_writer import MultiVolumePdfWriter, PDF_DPI, PDF_JPEG_QUALITY, PDF_PAGE_MAX_SIZE
+from src.utils.send_scheduler import send_scheduler
+from src.utils.leaderboard import get_cached_leaderboard
+from src.utils.background_jobs import BackgroundJob, ProgressMessage, start_job, PROGRESS_EDIT_INTERVAL
+from src.utils.outbox_worker import OutboxWorker
+from src.utils.result_digest import ResultDigest, format_single_result_message
+from src.database.outbox_data import get_batch_progress
+from src.utils.answer_key import compile_answer_key, parse_user_answers, grade_answers, count_questions, \
+    iter_answers, max_question_number, NO_ANSWER, MAX_QUESTION_NUMBER
 from PIL import Image
 import asyncio
 import functools
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -42,78 +62,146 @@ if not hasattr(asyncio, 'to_thread'):
 
     asyncio.to_thread = to_thread
 
+# Shablonlar ro'yxati manifestlardan olinadi (src/utils/cert_registry.py)
 CERTIFICATE_TEMPLATES = {
-    1: {"file": "sertifikatlar/sertifikat_shablon1.png", "desc": "Shablon 1"},
-    2: {"file": "sertifikatlar/sertifikat_shablon2.png", "desc": "Shablon 2"},
-    3: {"file": "sertifikatlar/sertifikat_shablon3.png", "desc": "Shablon 3"},
-    4: {"file": "sertifikatlar/sertifikat_shablon4.png", "desc": "Shablon 4"},
-    5: {"file": "sertifikatlar/sertifikat_shablon5.png", "desc": "Shablon 5"},
-    6: {"file": "sertifikatlar/sertifikat_shablon6.png", "desc": "Shablon 6"},
-    7: {"file": "sertifikatlar/sertifikat_shablon7.png", "desc": "Shablon 7"},
-    8: {"file": "sertifikatlar/sertifikat_shablon8.png", "desc": "Shablon 8"},
-    9: {"file": "sertifikatlar/sertifikat_shablon9.png", "desc": "Shablon 9"},
-    10: {"file": "sertifikatlar/sertifikat_shablon10.png", "desc": "Shablon 10"},
+    manifest.id: {"file": manifest.preview_file, "desc": manifest.title}
+    for manifest in TEMPLATE_MANIFESTS.values()
 }
 CERT_IDS = sorted(CERTIFICATE_TEMPLATES.keys())
 MAX_CERT_INDEX = len(CERT_IDS) - 1
 
-TELEGRAM_MESSAGE_BATCH_SIZE = 20
-TELEGRAM_MESSAGE_DELAY = 1.1
+LIVE_STATUS_MIN_INTERVAL = 5.0  # Holat xabari ko'pi bilan shuncha soniyada bir marta yangilanadi
+LIVE_STATUS_IDLE_TTL = 6 * 60 * 60  # Shuncha vaqt yangilanmagan holat xabari unutiladi (soniya)
 
 
-@router.callback_query(F.data.startswith("live_status:"))
-async def handle_live_status(callback: CallbackQuery, session_factory: async_sessionmaker[AsyncSession]):
-    test_id = int(callback.data.split(":")[1])
+@dataclass
+class LiveStatusView:
+    message_id: int
+    rendered_version: int
+    edited_at: float
+    pending: Optional[asyncio.Task] = None
 
-    async with session_factory() as session:
-        # Bazadan joriy natijalarni olamiz
-        results = await get_test_results_with_users(session, test_id)
 
-    if not results:
-        await callback.answer("Hozircha hech kim test ishlamadi ⌛️", show_alert=True)
-        return
+# (chat_id, test_id) -> ijodkorga yuborilgan yagona holat xabari
+live_status_views: Dict[Tuple[int, int], LiveStatusView] = {}
+
 
-    # Natijalarni saralash (nechanchi o'rindaligini aniqlash uchun)
-    sorted_results = sorted(results, key=lambda x: x[4], reverse=True)
+def evict_live_status_views(test_id: Optional[int] = None):
+    """Yakunlangan test (`test_id`) va uzoq vaqt yangilanmagan holat xabarlarini xotiradan o'chiradi."""
+    now = time.monotonic()
+    for key, view in list(live_status_views.items()):
+        if key[1] == test_id or now - view.edited_at > LIVE_STATUS_IDLE_TTL:
+            live_status_views.pop(key, None)
+            if view.pending is not None:
+                view.pending.cancel()
+
+
+def get_live_status_kb(test_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🔄 Yangilash", callback_data=f"live_status:{test_id}")]
+    ])
+
+
+async def render_live_status(session_factory: async_sessionmaker[AsyncSession], test_id: int) -> Tuple[str, int, int]:
+    """Qaytaradi: (matn, reyting versiyasi, ishtirokchilar soni)."""
+    async with session_factory() as session:
+        # Reyting xotirada saralangan holda turadi — faqat top 10 ismlari bazadan olinadi
+        leaderboard = await get_test_leaderboard(session, test_id)
+        version = leaderboard.version
+        top_entries = leaderboard.top(10)
+        users = await get_users_by_ids(session, [entry.user_id for entry in top_entries])
 
     report = f"📊 <b>Test ID: {test_id} bo'yicha joriy holat:</b>\n\n"
-    for index, res in enumerate(sorted_results[:10]):  # Faqat top 10 talikni ko'rsatish
-        _, first_name, last_name, _, correct, total, _ = res
-        full_name = f"{first_name} {last_name or ''}".strip()
-        report += f"{index + 1}. {full_name} — {correct}/{total} ✅\n"
+    for index, entry in enumerate(top_entries):  # Faqat top 10 talikni ko'rsatish
+        user = users.get(entry.user_id)
+        full_name = f"{user.first_name} {user.last_name or ''}".strip() if user else str(entry.user_id)
+        report += f"{index + 1}. {full_name} — {entry.correct}/{entry.total} ✅\n"
+
+    if len(leaderboard) > 10:
+        report += f"\n... va yana {len(leaderboard) - 10} kishi."
+
+    return report, version, len(leaderboard)
+
+
+async def refresh_live_status(bot: Bot, session_factory: async_sessionmaker[AsyncSession],
+                              chat_id: int, test_id: int, delay: float = 0):
+    """Mavjud holat xabarini joyida tahrirlaydi (kerak bo'lsa kechiktirib)."""
+    view = live_status_views.get((chat_id, test_id))
+    if view is None:
+        return
+    try:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if live_status_views.get((chat_id, test_id)) is not view:
+            # Kutish davomida test yakunlangan yoki xabar unutilgan
+            return
+        report, version, _ = await render_live_status(session_factory, test_id)
+        if view.rendered_version == version:
+            return
+        try:
+            await bot.edit_message_text(
+                text=report, chat_id=chat_id, message_id=view.message_id,
+                parse_mode='HTML', reply_markup=get_live_status_kb(test_id)
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                # Xabar o'chirilgan bo'lishi mumkin — keyingi bosishda yangisi yuboriladi
+                live_status_views.pop((chat_id, test_id), None)
+                logger.warning(f"Holat xabarini tahrirlab bo'lmadi (test {test_id}): {e}")
+                return
+        view.rendered_version = version
+        view.edited_at = time.monotonic()
+    except Exception as e:
+        logger.error(f"Holat xabarini yangilashda xato (test {test_id}): {e}")
+    finally:
+        view.pending = None
 
-    if len(sorted_results) > 10:
-        report += f"\n... va yana {len(sorted_results) - 10} kishi."
 
-    # Xabarni yangilash yoki yangi xabar yuborish
-    await callback.message.answer(report, parse_mode='HTML')
-    await callback.answer()
+@router.callback_query(F.data.startswith("live_status:"))
+async def handle_live_status(callback: CallbackQuery, session_factory: async_sessionmaker[AsyncSession], bot: Bot):
+    test_id = int(callback.data.split(":")[1])
+    chat_id = callback.message.chat.id
+    evict_live_status_views()
+    view = live_status_views.get((chat_id, test_id))
+
+    if view is None:
+        report, version, participants = await render_live_status(session_factory, test_id)
+        if not participants:
+            await callback.answer("Hozircha hech kim test ishlamadi ⌛️", show_alert=True)
+            return
 
+        sent = await callback.message.answer(report, parse_mode='HTML', reply_markup=get_live_status_kb(test_id))
+        live_status_views[(chat_id, test_id)] = LiveStatusView(sent.message_id, version, time.monotonic())
+        await callback.answer()
+        return
+
+    # Bitta xabar yangilanadi: tez-tez bosishlar va oraliqda kelgan natijalar birlashtiriladi
+    if view.pending is not None:
+        await callback.answer("⏳ Holat tez orada yangilanadi")
+        return
 
-def format_user_report(correct_answers_key: str, user_answers_key: str) -> str:
-    def create_answer_dict_from_string(answer_key):
-        return {k: v for k, v in re.findall(r'(\d+)([a-z])', answer_key)}
+    leaderboard = get_cached_leaderboard(test_id)
+    if leaderboard is not None and leaderboard.version == view.rendered_version:
+        await callback.answer("Yangi natija yo'q — holat dolzarb ✅")
+        return
 
-    correct_dict = create_answer_dict_from_string(correct_answers_key)
-    user_dict = create_answer_dict_from_string(user_answers_key)
+    wait = LIVE_STATUS_MIN_INTERVAL - (time.monotonic() - view.edited_at)
+    view.pending = asyncio.create_task(refresh_live_status(bot, session_factory, chat_id, test_id, delay=max(wait, 0)))
+    await callback.answer("🔄 Holat yangilanmoqda" if wait <= 0 else "⏳ Holat tez orada yangilanadi")
 
-    report_lines = [""]
 
-    # Savollarni tartiblash va solishtirish
-    sorted_q_nums = sorted([int(k) for k in correct_dict.keys()])
+def format_user_report(compiled_key: bytes, user_answers_key: str) -> str:
+    user_answers = parse_user_answers(user_answers_key, len(compiled_key))
 
-    for q_num_int in sorted_q_nums:
-        q_num = str(q_num_int)
-        correct_answer = correct_dict.get(q_num, '?')
-        user_answer = user_dict.get(q_num, 'Javob berilmagan')  # Agar javob bermagan bo'lsa
+    report_lines = [""]
 
-        icon = '❓'
+    # Savollar kalitda raqam bo'yicha tartiblangan holda saqlanadi
+    for q_num, correct_answer in iter_answers(compiled_key):
+        user_answer = user_answers[q_num]
 
-        if user_answer != 'Javob berilmagan':
-            if user_answer == correct_answer:
-                icon = '✅'
-            else:
-                icon = '❌'
+        if user_answer != NO_ANSWER:
+            user_answer = chr(user_answer)
+            icon = '✅' if user_answer == correct_answer else '❌'
 
             report_lines.append(
                 f"{icon} {q_num}. Savol:\n"
@@ -123,101 +211,60 @@ def format_user_report(correct_answers_key: str, user_answers_key: str) -> str:
         else:
 
             report_lines.append(
-                f"{icon} {q_num}. Savol: Javob berilmagan\n"
+                f"❓ {q_num}. Savol: Javob berilmagan\n"
                 f"   To'g'ri javob: <b>{correct_answer.upper()}</b>"
             )
 
     return "\n".join(report_lines)
 
 
-async def send_message_batch(bot: Bot, user_id_list: List[int], message_text: str, parse_mode: str = 'HTML'):
-    for i in range(0, len(user_id_list), TELEGRAM_MESSAGE_BATCH_SIZE):
-        batch = user_id_list[i:i + TELEGRAM_MESSAGE_BATCH_SIZE]
-        send_tasks = []
-        for user_id in batch:
-            task = bot.send_message(
-                chat_id=user_id,
-                text=message_text,
-                parse_mode=parse_mode
-            )
-            send_tasks.append(task)
-        await asyncio.gather(*send_tasks, return_exceptions=True)
-        if i + TELEGRAM_MESSAGE_BATCH_SIZE < len(user_id_list):
-            await asyncio.sleep(TELEGRAM_MESSAGE_DELAY)
-            logger.info(f"Batch completed. Pausing for {TELEGRAM_MESSAGE_DELAY}s...")
-    logger.info(f"Message sent to {len(user_id_list)} users in batches.")
-
-
 TELEGRAM_MAX_FILE_SIZE_BYTES = 49 * 1024 * 1024  # 49 MB (Telegram limiti 50MB)
-PDF_MAX_WIDTH = 1240  # Kenglik piksel (A4 @ 150 dpi)
-PDF_MAX_HEIGHT = 1754  # Balandlik piksel (A4 @ 150 dpi)
-PDF_JPEG_QUALITY = 82  # JPEG siqish darajasi (vizual farq sezilmaydi)
 
 
 def _resize_for_pdf(img: Image.Image) -> Image.Image:
     """Rasmni A4 o'lchamiga moslashtiradi va RAM tejaydi."""
-    img.thumbnail((PDF_MAX_WIDTH, PDF_MAX_HEIGHT), Image.LANCZOS)
+    img.thumbnail(PDF_PAGE_MAX_SIZE, Image.LANCZOS)
     if img.mode != 'RGB':
         img = img.convert('RGB')
     return img
 
 
-def combine_images_to_pdf_sync(image_paths: List[str], output_pdf_path: str) -> Optional[str]:
+def combine_images_to_pdf_sync(image_paths: List[str], output_pdf_path: str) -> Optional[List[str]]:
     """
-    PNG sertifikatlarni bitta PDF fayliga birlashtiradi.
-    Har bir rasm A4 o'lchamiga kichraytiriladi va JPEG sifatida
-    siqiladi — bu PDF hajmini 10-15 barobar kamaytiradi.
+    PNG sertifikatlarni PDF fayl(lar)iga birlashtiradi.
+    Har bir rasm A4 o'lchamiga kichraytiriladi, JPEG sifatida siqiladi va
+    darhol faylga yoziladi — xotirada bir vaqtda faqat bitta sahifa turadi.
+    Fayl Telegram limitiga yetsa, keyingi sahifalar yangi jildga ("_part2") yoziladi.
+    Qaytaradi: jildlar yo'llari ro'yxati yoki xato bo'lsa None.
     """
     if not image_paths:
         return None
 
-    images = []
+    writer = MultiVolumePdfWriter(output_pdf_path, TELEGRAM_MAX_FILE_SIZE_BYTES, dpi=PDF_DPI)
     try:
         for path in image_paths:
             if not os.path.exists(path):
                 logger.warning(f"Sertifikat fayli topilmadi, o'tkazib yuborildi: {path}")
                 continue
 
-            img = Image.open(path)
-            img = _resize_for_pdf(img)
-            images.append(img)
+            with Image.open(path) as img:
+                writer.add_image(_resize_for_pdf(img), quality=PDF_JPEG_QUALITY)
 
-        if not images:
+        if not writer.page_count:
+            writer.abort()
             logger.error("PDF uchun hech qanday rasm yuklanmadi.")
             return None
 
-        # PDF'ni JPEG siqish bilan saqlash (PNG'dan 10-15x kichikroq)
-        images[0].save(
-            output_pdf_path,
-            "PDF",
-            save_all=True,
-            append_images=images[1:],
-            quality=PDF_JPEG_QUALITY,
-            resolution=150.0,
-        )
-
-        # Telegram limitini tekshirish
-        pdf_size = os.path.getsize(output_pdf_path)
-        logger.info(f"PDF yaratildi: {len(images)} ta sertifikat, hajmi {pdf_size // 1024 // 1024} MB")
-
-        if pdf_size > TELEGRAM_MAX_FILE_SIZE_BYTES:
-            logger.error(
-                f"PDF hajmi ({pdf_size // 1024 // 1024} MB) Telegram limitidan (49 MB) katta! "
-                f"Sertifikat soni: {len(images)}"
-            )
-            return f"TOO_LARGE:{pdf_size}"  # Maxsus belgi — yuqorida tekshiriladi
-
-        return output_pdf_path
+        volumes = writer.close()
+        total_size = sum(os.path.getsize(volume) for volume in volumes)
+        logger.info(f"PDF yaratildi: {writer.page_count} ta sertifikat, {len(volumes)} ta jild, "
+                    f"hajmi {total_size // 1024 // 1024} MB")
+        return volumes
 
     except Exception as e:
+        writer.abort()
         logger.error(f"PDF yaratishda xato: {e}", exc_info=True)
         return None
-    finally:
-        for img in images:
-            try:
-                img.close()
-            except Exception:
-                pass
 
 
 def get_cert_pagination_kb(current_index: int):
@@ -238,36 +285,98 @@ def get_cert_pagination_kb(current_index: int):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-async def send_cert_template(bot: Bot, chat_id: int, current_index: int, msg_id: int = None):
+# Shablon ko'rinishlarining Telegram file_id'lari: {cert_id: (file_signature, file_id)}
+_template_file_ids: Dict[int, Tuple[str, str]] = {}
+_template_file_ids_loaded = False
+
+
+def _template_file_signature(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+async def _get_template_file_id(session_factory: async_sessionmaker[AsyncSession], cert_id: int,
+                                signature: str) -> Optional[str]:
+    global _template_file_ids_loaded
+    if not _template_file_ids_loaded:
+        async with session_factory() as session:
+            previews = await get_template_previews(session)
+        _template_file_ids.update({
+            template_id: (preview.file_signature, preview.file_id) for template_id, preview in previews.items()
+        })
+        _template_file_ids_loaded = True
+
+    cached = _template_file_ids.get(cert_id)
+    if cached and cached[0] == signature:
+        return cached[1]
+    return None
+
+
+async def _remember_template_file_id(session_factory: async_sessionmaker[AsyncSession], cert_id: int,
+                                     signature: str, sent_message: Message):
+    if not sent_message.photo:
+        return
+    file_id = sent_message.photo[-1].file_id
+    if _template_file_ids.get(cert_id) == (signature, file_id):
+        return
+    _template_file_ids[cert_id] = (signature, file_id)
+    try:
+        async with session_factory() as session:
+            await save_template_preview(session, cert_id, file_id, signature)
+    except Exception as e:
+        logger.error(f"Shablon {cert_id} file_id'sini saqlashda xato: {e}")
+
+
+async def send_cert_template(bot: Bot, chat_id: int, current_index: int,
+                             session_factory: async_sessionmaker[AsyncSession], msg_id: int = None):
+    """
+    Shablonni ko'rsatadi. Rasm faqat birinchi marta yuklanadi, keyin Telegram file_id
+    ishlatiladi. msg_id berilsa, o'sha xabar edit_message_media bilan almashtiriladi.
+    """
     cert_id = CERT_IDS[current_index]
     template_data = CERTIFICATE_TEMPLATES[cert_id]
     photo_path = template_data['file']
     caption = f"🖼 Sertifikat shabloni {cert_id} / {MAX_CERT_INDEX + 1}\n\n"
     caption += "Iltimos, test ishtirokchilari uchun sertifikat shablonini tanlang:"
     keyboard = get_cert_pagination_kb(current_index)
-    photo = FSInputFile(photo_path)
-
-    if msg_id:
-        await bot.delete_message(chat_id, msg_id)
-
-    sent_message = await bot.send_photo(
-        chat_id=chat_id,
-        photo=photo,
-        caption=caption,
-        parse_mode='Markdown',
-        reply_markup=keyboard
-    )
-
-    return sent_message.message_id
+    signature = _template_file_signature(photo_path)
+    file_id = await _get_template_file_id(session_factory, cert_id, signature)
 
+    for photo in ([file_id] if file_id else []) + [FSInputFile(photo_path)]:
+        try:
+            if msg_id:
+                sent_message = await bot.edit_message_media(
+                    chat_id=chat_id,
+                    message_id=msg_id,
+                    media=InputMediaPhoto(media=photo, caption=caption, parse_mode='Markdown'),
+                    reply_markup=keyboard
+                )
+            else:
+                sent_message = await bot.send_photo(
+                    chat_id=chat_id,
+                    photo=photo,
+                    caption=caption,
+                    parse_mode='Markdown',
+                    reply_markup=keyboard
+                )
+        except TelegramBadRequest as e:
+            if isinstance(photo, str):
+                # file_id eskirgan — rasm qayta yuklanadi
+                logger.warning(f"Shablon {cert_id} file_id yaroqsiz, qayta yuklanadi: {e}")
+                _template_file_ids.pop(cert_id, None)
+                continue
+            if not msg_id:
+                raise
+            # Eski xabarni tahrirlab bo'lmadi — o'chirib, yangisini yuboramiz
+            logger.warning(f"Shablon xabarini tahrirlab bo'lmadi, yangisi yuboriladi: {e}")
+            try:
+                await bot.delete_message(chat_id, msg_id)
+            except TelegramBadRequest:
+                pass
+            return await send_cert_template(bot, chat_id, current_index, session_factory)
 
-def create_answer_dict_from_string(answer_key_raw: str) -> dict:
-    pattern = r'(\d+[a-z])'
-    matches = re.findall(pattern, answer_key_raw.lower())
-    result_dict = {}
-    for pair in matches:
-        result_dict[pair[:-1]] = pair[-1]
-    return result_dict
+        await _remember_template_file_id(session_factory, cert_id, signature, sent_message)
+        return sent_message.message_id
 
 
 TEST_ID_LENGTH = 5
@@ -283,6 +392,27 @@ async def generate_test_id(session: AsyncSession) -> int:
             return new_id
 
 
+@router.message(F.text.regexp(r'^/(each_result|digest)_(\d{5})$'))
+async def toggle_result_digest(message: Message, session_factory: async_sessionmaker[AsyncSession]):
+    # Holatli handlerlardan oldin turadi: buyruq istalgan jarayon o'rtasida ham ishlaydi va uni buzmaydi
+    command, test_code = re.fullmatch(r'^/(each_result|digest)_(\d{5})$', message.text).groups()
+    test_id = int(test_code)
+
+    async with session_factory() as session:
+        test_data = await get_test_by_id(session, test_id)
+        if not test_data or test_data.creator_id != message.from_user.id:
+            await message.answer("Kechirasiz, bu kod bilan test topilmadi yoki siz uning muallifi emassiz.")
+            return
+        await set_result_digest_disabled(session, test_id, disabled=command == "each_result")
+
+    if command == "each_result":
+        await message.answer(f"🔔 {test_id} testi bo'yicha har bir natija alohida xabar bilan yuboriladi.\n"
+                             f"Qayta jamlab olish: /digest_{test_id}")
+    else:
+        await message.answer(f"🔕 {test_id} testi bo'yicha natijalar jamlanib yuboriladi.\n"
+                             f"Har birini alohida olish: /each_result_{test_id}")
+
+
 @router.message(F.text == "/new_test")
 @router.message(F.text == "➕ Test yaratish", IsSubscribed())
 async def start_create_test_handler(message: Message, state: FSMContext,
@@ -332,6 +462,10 @@ async def save_new_test(
         await message.answer(
             "Qayta urining. Kalit faqat harf va raqamlardan iborat va kamida 4 belgi bo'lishi kerak. ‼️")
         return
+    if max_question_number(answer_key) > MAX_QUESTION_NUMBER:
+        await message.answer(
+            f"Savol raqami {MAX_QUESTION_NUMBER} dan oshmasligi kerak. Qayta kiriting ‼️")
+        return
 
     user_data = await state.get_data()
     new_test_id = user_data.get("test_id")
@@ -374,7 +508,8 @@ async def save_new_test(
                 ]
             )
 
-            questions_count = len(re.findall(r'\d+[a-z]', test_answer))
+            # Kalit shu yerda bir marta kompilyatsiya qilinadi va keshda qoladi
+            questions_count = count_questions(new_test.compiled_answer)
             await message.answer(
                 f"Fan: <b>{test_title}</b>\n"
                 f"Id: <i><code>{new_test.id}</code></i>\n"
@@ -451,7 +586,7 @@ async def process_test_code_for_check(
 
 @router.message(CheckStates.waiting_for_user_answers, F.text, IsSubscribed())
 async def process_user_answers(message: Message, state: FSMContext, session_factory: async_sessionmaker[AsyncSession],
-                               bot: Bot):
+                               bot: Bot, outbox: OutboxWorker, result_digest: ResultDigest):
     user_answers_raw = message.text.strip().lower()
     VALID_KEY_PATTERN = r'^(\d+[a-z])+$'
 
@@ -470,32 +605,11 @@ async def process_user_answers(message: Message, state: FSMContext, session_fact
     data = await state.get_data()
     test_id = data.get('current_test_id')
     correct_answers_key_raw = data.get('correct_answers')
-    pattern = r'(\d+[a-z])'
-    correct_matches = re.findall(pattern, correct_answers_key_raw)
-    user_matches = re.findall(pattern, user_answers_raw)
+    compiled_key = compile_answer_key(correct_answers_key_raw)
+    user_answers = parse_user_answers(user_answers_raw, len(compiled_key))
 
-    if not user_matches:
-        await message.answer(
-            "Kiritilgan javoblar formati noto'g'ri. "
-        )
-        return
-
-    def create_answer_dict(matches):
-        result_dict = {}
-        for pair in matches:
-            question_num = pair[:-1]
-            answer_char = pair[-1]
-            result_dict[question_num] = answer_char
-        return result_dict
-
-    correct_dict = create_answer_dict(correct_matches)
-    user_dict = create_answer_dict(user_matches)
-    total_questions = len(correct_dict)
-    correct_count = 0
-
-    for question_num, correct_answer in correct_dict.items():
-        if question_num in user_dict and user_dict[question_num] == correct_answer:
-            correct_count += 1
+    total_questions = count_questions(compiled_key)
+    correct_count = grade_answers(compiled_key, user_answers)
 
     incorrect_count = total_questions - correct_count
     creator_id = None
@@ -530,7 +644,17 @@ async def process_user_answers(message: Message, state: FSMContext, session_fact
         else:
             registered_user_name = message.from_user.full_name
 
+        digest_disabled = await is_result_digest_disabled(session, test_id)
+
         try:
+            # Kalit test davomida tuzatilgan bo'lishi mumkin — eng so'nggisi bo'yicha baholaymiz.
+            # Test qatori natija saqlanguncha FOR SHARE bilan qulflanadi: kalit shu orada o'zgarmaydi
+            current_answer = await get_test_answer_for_share(session, test_id)
+            if current_answer and current_answer != correct_answers_key_raw:
+                compiled_key = compile_answer_key(current_answer)
+                total_questions = count_questions(compiled_key)
+                correct_count = grade_answers(compiled_key, parse_user_answers(user_answers_raw, len(compiled_key)))
+
             await add_new_result(
                 session=session,
                 user_id=message.from_user.id,
@@ -543,16 +667,19 @@ async def process_user_answers(message: Message, state: FSMContext, session_fact
             logger.error("Error saving result to DB: %s", e)
 
     if creator_id:
-        creator_notification_message = (
-            f"<b> YANGI NATIJA </b> \n\n"
-            f"Test kodi: <i>{test_id}</i> \n\n"
-            f"Fan nomi: <i>{test_title}</i> \n\n"
-            f"<i>{registered_user_name} - {correct_count}/{total_questions}</i>"
-        )
         try:
-            await bot.send_message(chat_id=creator_id, text=creator_notification_message, parse_mode='HTML')
+            if digest_disabled:
+                creator_notification_message = format_single_result_message(
+                    test_id, test_title, registered_user_name, correct_count, total_questions
+                ) + f"\n\n🔕 Natijalarni jamlab olish: /digest_{test_id}"
+                await outbox.enqueue([(creator_id, creator_notification_message)])
+            else:
+                # Natijalar ijodkor va test bo'yicha jamlanib, davriy bitta xabar bilan yuboriladi
+                await result_digest.add(
+                    creator_id, test_id, test_title, registered_user_name, correct_count, total_questions
+                )
         except Exception as e:
-            logger.error("Error sending notification to creator %s: %s", creator_id, e)
+            logger.error("Error queueing notification to creator %s: %s", creator_id, e)
 
     if not 'test_title' in locals():
         test_title = test_info.title if test_info else "Noma'lum test"
@@ -568,6 +695,195 @@ async def process_user_answers(message: Message, state: FSMContext, session_fact
     await message.answer("👇 Asosiy menyu 👇", reply_markup=mainMenu)
 
 
+@router.message(F.text == "/fix_key")
+async def start_fix_key_handler(message: Message, state: FSMContext):
+    await state.clear()
+    await state.update_data(regrade_mode="fix")
+    await message.answer(
+        "Kalitini tuzatmoqchi bo'lgan testingiz ID kodini kiriting (masalan: 12345) ✏️:",
+        reply_markup=ReplyKeyboardRemove()
+    )
+    await state.set_state(CheckStates.waiting_for_regrade_code)
+
+
+@router.message(F.text == "/regrade_test")
+async def start_regrade_test_handler(message: Message, state: FSMContext):
+    await state.clear()
+    await state.update_data(regrade_mode="full")
+    await message.answer(
+        "Kalitini almashtirmoqchi bo'lgan testingiz ID kodini kiriting (masalan: 12345) ✏️:",
+        reply_markup=ReplyKeyboardRemove()
+    )
+    await state.set_state(CheckStates.waiting_for_regrade_code)
+
+
+@router.message(CheckStates.waiting_for_regrade_code, F.text)
+async def process_regrade_test_code(
+        message: Message,
+        state: FSMContext,
+        session_factory: async_sessionmaker[AsyncSession]
+):
+    test_code = message.text.strip()
+    if not re.fullmatch(r'^\d{5}$', test_code):
+        await message.answer("Kod formati noto'g'ri. Iltimos, faqat 5 xonali raqam kiriting ‼️")
+        return
+
+    async with session_factory() as session:
+        test_data = await get_test_by_id(session, int(test_code))
+
+    if not test_data or test_data.creator_id != message.from_user.id:
+        await message.answer("Kechirasiz, bu kod bilan test topilmadi yoki siz uning muallifi emassiz.")
+        await state.clear()
+        await message.answer("👇 Asosiy menyu 👇", reply_markup=mainMenu)
+        return
+
+    await state.update_data(regrade_test_id=test_data.id)
+    data = await state.get_data()
+    if data.get('regrade_mode') == "fix":
+        await message.answer(
+            f"Fan: <b>{test_data.title}</b>\n\n"
+            f"Tuzatiladigan savollarni yangi javobi bilan kiriting.\n"
+            f"NAMUNA: <code>17c</code> yoki <code>17c23a</code>\n\n"
+            f"Faqat shu savollar bo'yicha natijalar qayta hisoblanadi.",
+            parse_mode='HTML'
+        )
+        await state.set_state(CheckStates.waiting_for_key_fix)
+        return
+
+    await message.answer(
+        f"Fan: <b>{test_data.title}</b>\n\n"
+        f"Yangi (to'g'rilangan) javob kalitini to'liq kiriting.\n"
+        f"NAMUNA: <code>1a2b3c4d...</code> (Bo'sh joylarsiz!)\n\n"
+        f"Barcha yuborilgan natijalar yangi kalit bo'yicha qayta baholanadi.",
+        parse_mode='HTML'
+    )
+    await state.set_state(CheckStates.waiting_for_regrade_key)
+
+
+@router.message(CheckStates.waiting_for_regrade_key, F.text)
+async def process_regrade_test_key(
+        message: Message,
+        state: FSMContext,
+        session_factory: async_sessionmaker[AsyncSession]
+):
+    answer_key = message.text.strip().lower()
+    if not re.fullmatch(r'^(\d+[a-z])+$', answer_key) or len(answer_key) < 4:
+        await message.answer(
+            "Javob kaliti formati noto'g'ri. NAMUNA: <code>1a2b3c4d...</code> ‼️",
+            parse_mode='HTML'
+        )
+        return
+    if max_question_number(answer_key) > MAX_QUESTION_NUMBER:
+        await message.answer(f"Savol raqami {MAX_QUESTION_NUMBER} dan oshmasligi kerak. Qayta kiriting ‼️")
+        return
+
+    data = await state.get_data()
+    test_id = data.get('regrade_test_id')
+    if test_id is None:
+        await message.answer("⚠️ Test ma'lumotlari topilmadi. Iltimos, qaytadan boshlang: /regrade_test",
+                             reply_markup=mainMenu)
+        await state.clear()
+        return
+
+    compiled_key = compile_answer_key(answer_key)
+    async with session_factory() as session:
+        try:
+            # Kalit va natijalar bitta tranzaksiyada: xato bo'lsa, eski kalit va eski ballar qoladi
+            if not await lock_test_for_update(session, test_id):
+                await message.answer("⚠️ Test topilmadi.", reply_markup=mainMenu)
+                await state.clear()
+                return
+            await update_test_answer(session, test_id, answer_key)
+            changed_count = await regrade_test_results(session, test_id, compiled_key)
+            await commit_answer_key_change(session, test_id)
+        except Exception as e:
+            await session.rollback()
+            logger.error("Error regrading results for test %s: %s", test_id, e)
+            await message.answer("Qayta baholashda texnik xato yuz berdi ‼️", reply_markup=mainMenu)
+            await state.clear()
+            return
+
+    logger.info(f"Test {test_id} regraded by {message.from_user.id}: {changed_count} results changed.")
+    await message.answer(
+        f"✅ Kalit yangilandi.\n"
+        f"Savollar soni: <b>{count_questions(compiled_key)} ta</b>\n"
+        f"Natijasi o'zgargan ishtirokchilar: <b>{changed_count} ta</b>",
+        parse_mode='HTML',
+        reply_markup=mainMenu
+    )
+    await state.clear()
+
+
+@router.message(CheckStates.waiting_for_key_fix, F.text)
+async def process_key_fix(
+        message: Message,
+        state: FSMContext,
+        session_factory: async_sessionmaker[AsyncSession]
+):
+    fix_raw = message.text.strip().lower()
+    if not re.fullmatch(r'^(\d+[a-z])+$', fix_raw):
+        await message.answer("Format noto'g'ri. NAMUNA: <code>17c</code> yoki <code>17c23a</code> ‼️",
+                             parse_mode='HTML')
+        return
+
+    data = await state.get_data()
+    test_id = data.get('regrade_test_id')
+
+    async with session_factory() as session:
+        # Eski kalit keshdan emas, qulflangan qatordan o'qiladi: shu paytda saqlanayotgan natijalar
+        # commit bo'lguncha kutadi, keyingilari esa yangi kalit bilan baholanadi — delta ikki marta qo'shilmaydi
+        test_data = await lock_test_for_update(session, test_id) if test_id is not None else None
+        if not test_data:
+            await message.answer("⚠️ Test ma'lumotlari topilmadi. Iltimos, qaytadan boshlang: /fix_key",
+                                 reply_markup=mainMenu)
+            await state.clear()
+            return
+
+        old_key = test_data.compiled_answer
+        changes = {}
+        for q_num, letter in re.findall(r'(\d+)([a-z])', fix_raw):
+            q_num = int(q_num)
+            if q_num >= len(old_key) or old_key[q_num] == NO_ANSWER:
+                await message.answer(f"{q_num}-savol bu testda mavjud emas. Qayta kiriting ‼️")
+                return
+            if old_key[q_num] != ord(letter):
+                changes[q_num] = letter
+
+        if not changes:
+            await message.answer("Kalitda hech narsa o'zgarmadi.", reply_markup=mainMenu)
+            await state.clear()
+            return
+
+        new_key = bytearray(old_key)
+        for q_num, letter in changes.items():
+            new_key[q_num] = ord(letter)
+        new_answer = "".join(f"{q_num}{answer}" for q_num, answer in iter_answers(bytes(new_key)))
+
+        try:
+            await update_test_answer(session, test_id, new_answer)
+            changed_count = await apply_answer_key_correction(session, test_id, old_key, changes)
+            await commit_answer_key_change(session, test_id)
+        except Exception as e:
+            await session.rollback()
+            logger.error("Error applying key fix for test %s: %s", test_id, e)
+            await message.answer("Kalitni tuzatishda texnik xato yuz berdi ‼️", reply_markup=mainMenu)
+            await state.clear()
+            return
+
+    changes_text = "\n".join(
+        f"{q_num}-savol: <b>{chr(old_key[q_num]).upper()}</b> → <b>{letter.upper()}</b>"
+        for q_num, letter in sorted(changes.items())
+    )
+    logger.info(f"Test {test_id} key fixed by {message.from_user.id}: {changes}, {changed_count} results changed.")
+    await message.answer(
+        f"✅ Kalit tuzatildi:\n{changes_text}\n\n"
+        f"Natijasi o'zgargan ishtirokchilar: <b>{changed_count} ta</b>",
+        parse_mode='HTML',
+        reply_markup=mainMenu
+    )
+    await state.clear()
+
+
 @router.message(F.text == "/end_test")
 @router.message(F.text == "🏆 Testni yakunlash", IsSubscribed())
 async def start_finish_test_handler(message: Message, state: FSMContext):
@@ -585,7 +901,9 @@ async def process_finish_test_code(
         message: Message,
         state: FSMContext,
         session_factory: async_sessionmaker[AsyncSession],
-        bot: Bot
+        bot: Bot,
+        outbox: OutboxWorker,
+        scratch: ScratchSpace
 ):
     test_code = message.text.strip()
 
@@ -599,7 +917,7 @@ async def process_finish_test_code(
         return
 
     results = []
-    user_ids_who_passed = []
+    unregistered_results = []
     test_data = None
     creator_name = "Noma'lum"
 
@@ -623,7 +941,8 @@ async def process_finish_test_code(
 
         try:
             results = await get_test_results_with_users(session, test_code)
-            user_ids_who_passed = await get_unique_user_ids_for_test(session, test_code)
+            # Ro'yxatdan o'tmaganlar reytingga kirmaydi, lekin yakuniy xabarni baribir oladi
+            unregistered_results = await get_results_without_user(session, test_code)
         except Exception as e:
             await message.answer("Natijalarni olishda xatolik yuz berdi ‼️")
             logger.error("DB Error getting results in process_finish_test_code: %s", e)
@@ -633,51 +952,23 @@ async def process_finish_test_code(
 
         is_deactivated = await deactivate_test(session, test_code)
 
-    result_list = []
-    # current_rank = 0
-    # last_correct_count = -1
-    # rank_count = 0
-    sorted_results_for_ranking = sorted(results, key=lambda x: x[4], reverse=True)
+    evict_live_status_views(test_code)
 
+    sorted_results_for_ranking = sorted(results, key=lambda x: x[4], reverse=True)
+    result_list = []
     for index, res_tuple in enumerate(sorted_results_for_ranking):
-        user_id_res, first_name, last_name, phone_number, correct, total, user_answers_key = res_tuple
-        current_rank = index + 1
-
+        _, first_name, last_name, _, correct, total, _ = res_tuple
         full_name = f"{first_name} {last_name or ''}".strip()
-        result_list.append(f"<i>{current_rank}: {full_name} - {correct}/{total}</i>")
-
-        if not user_answers_key:
-            continue
-        report_text = format_user_report(test_data.answer, user_answers_key)
-        personal_message = (
-            f"🎉 <b>TEST YAKUNLANDI: SIZNING HISOBOTINGIZ</b> 🎉\n\n"
-            f"Fan nomi: <b>{test_data.title}</b>\n"
-            f"Natija: <b>{correct}/{total}</b>\n"
-            f"--------------------------------------\n"
-            f"<b>Ishlaganlaringizni ko'rishingiz mumkin</b>\n"
-            f"{report_text}\n"
-        )
+        result_list.append(f"<i>{index + 1}: {full_name} - {correct}/{total}</i>")
 
-        try:
-            # Har bir ishtirokchiga xabar yuborish
-            await bot.send_message(chat_id=user_id_res, text=personal_message, parse_mode='HTML')
-        except Exception as e:
-            logger.error(f"Error sending personal report to user {user_id_res}: {e}")
-
-    correct_answers_dict = create_answer_dict_from_string(test_data.answer)
-    formatted_answers = []
-    sorted_questions = sorted(correct_answers_dict.keys(), key=lambda x: int(x))
-
-    for q_num in sorted_questions:
-        answer = correct_answers_dict[q_num]
-        formatted_answers.append(f"{q_num}{answer}")
+    formatted_answers = [f"{q_num}{answer}" for q_num, answer in iter_answers(test_data.compiled_answer)]
 
     final_report = (
         f"✅ Test muvaffaqiyatli yakunlandi!\n\n"
         f"👤 Test muallifi: <b>{creator_name}</b>\n\n"
         f"📝 Fan nomi: <b>{test_data.title}</b>\n"
         f"🏷 Test kodi: <i><code>{test_code}</code></i>\n"
-        f"❓ Savollar soni: <b>{len(sorted_questions)} ta</b>\n"
+        f"❓ Savollar soni: <b>{len(formatted_answers)} ta</b>\n"
         f"👥 Jami ishlaganlar: <b>{len(results)} ta</b>\n"
         f"--- Natijalar ro'yxati ---\n\n"
     )
@@ -692,32 +983,6 @@ async def process_finish_test_code(
         f"<code>{' '.join(formatted_answers)}</code>"
     )
 
-    if is_deactivated:
-        excel_path = await asyncio.to_thread(
-            create_full_participant_report_pandas,
-            test_data.title,
-            results,
-            creator_name
-        )
-
-        if excel_path and os.path.exists(excel_path):
-            try:
-                await bot.send_document(
-                    chat_id=message.from_user.id,
-                    document=FSInputFile(excel_path),
-                    caption=f"📝 '{test_data.title}' testi bo'yicha ishtirokchilarning to'liq hisoboti.",
-                    parse_mode='HTML'
-                )
-                logger.info(f"Excel report for test {test_code} sent to creator {message.from_user.id}.")
-
-                os.remove(excel_path)
-                logger.info(f"Excel report file removed: {excel_path}")
-            except Exception as e:
-                await message.answer("Hisobot faylini yuborishda xatolik yuz berdi ‼️")
-                logger.error(f"Error sending Excel report: {e}")
-        else:
-            await message.answer("Hisobot faylini yaratishda xatolik yuz berdi. Iltimos, adminga murojaat qiling.")
-
     await message.answer(
         f"Test muvaffaqiyatli yakunlandi. Natijalar 👇\n\n{final_report}",
         parse_mode='HTML'
@@ -725,25 +990,35 @@ async def process_finish_test_code(
 
     await state.update_data(
         all_results=results,
-        all_user_ids=user_ids_who_passed,
         test_title=test_data.title,
         test_code=test_code,
         creator_name=creator_name,
         final_report=final_report,
     )
 
-    if user_ids_who_passed:
-        notification_message = (
-            f"🎉 Tabriklaymiz! <b>{test_data.title}</b> testi yakunlandi.\n\n"
-            f"Sizning natijangiz yakuniy hisobotga kiritildi."
-        )
-
-        await send_message_batch(
+    # Hisobotlar, Excel va bildirishnomalar fon vazifasida yuboriladi —
+    # handler darhol qaytadi va ijodkorning FSM holatini band qilmaydi.
+    progress_msg = await message.answer(
+        f"⏳ Shaxsiy hisobotlar yuborilmoqda: 0/{len(sorted_results_for_ranking) + len(unregistered_results)}"
+    )
+    start_job(
+        f"finish:{test_code}",
+        f"'{test_data.title}' testini yakunlash",
+        functools.partial(
+            finalize_test_job,
             bot=bot,
-            user_id_list=user_ids_who_passed,
-            message_text=notification_message,
-            parse_mode='HTML'
+            outbox=outbox,
+            creator_chat_id=message.chat.id,
+            test_data=test_data,
+            creator_name=creator_name,
+            sorted_results=sorted_results_for_ranking,
+            unregistered_results=unregistered_results,
+            send_excel=is_deactivated,
+            progress=ProgressMessage(bot, message.chat.id, progress_msg.message_id,
+                                     "⏳ Shaxsiy hisobotlar yuborilmoqda: {done}/{total}"),
+            scratch=scratch,
         )
+    )
 
     if results:
 
@@ -751,7 +1026,8 @@ async def process_finish_test_code(
         new_msg_id = await send_cert_template(
             bot=bot,
             chat_id=message.chat.id,
-            current_index=0
+            current_index=0,
+            session_factory=session_factory
         )
 
         await state.update_data(
@@ -763,8 +1039,94 @@ async def process_finish_test_code(
         await state.clear()
 
 
+async def finalize_test_job(
+        job: BackgroundJob,
+        bot: Bot,
+        outbox: OutboxWorker,
+        creator_chat_id: int,
+        test_data: Test,
+        creator_name: str,
+        sorted_results: List[Tuple],
+        unregistered_results: List[Tuple],
+        send_excel: bool,
+        progress: ProgressMessage,
+        scratch: ScratchSpace
+):
+    # Har bir ishtirokchiga bitta xabar: tabrik va shaxsiy hisobot birgalikda
+    personal_messages = []
+    notified_user_ids = set()
+    participants = [(user_id_res, correct, total, user_answers_key)
+                    for user_id_res, _, _, _, correct, total, user_answers_key in sorted_results]
+    participants.extend(unregistered_results)
+    for user_id_res, correct, total, user_answers_key in participants:
+        if user_id_res in notified_user_ids:
+            continue
+        notified_user_ids.add(user_id_res)
+
+        personal_message = (
+            f"🎉 <b>TEST YAKUNLANDI: SIZNING HISOBOTINGIZ</b> 🎉\n\n"
+            f"Tabriklaymiz! Natijangiz yakuniy hisobotga kiritildi.\n\n"
+            f"Fan nomi: <b>{test_data.title}</b>\n"
+            f"Natija: <b>{correct}/{total}</b>\n"
+        )
+        if user_answers_key:
+            report_text = format_user_report(test_data.compiled_answer, user_answers_key)
+            personal_message += (
+                f"--------------------------------------\n"
+                f"<b>Ishlaganlaringizni ko'rishingiz mumkin</b>\n"
+                f"{report_text}\n"
+            )
+        personal_messages.append((user_id_res, personal_message))
+
+    # Xabarlar outbox navbatiga yoziladi — bot qayta ishga tushsa ham yetkaziladi
+    reports_batch_key = f"finish:{test_data.id}:{int(time.time())}"
+    await outbox.enqueue(personal_messages, batch_key=reports_batch_key)
+
+    if send_excel:
+        # Fayl ish papkasida yaratiladi va yuborilgandan so'ng papka bilan birga o'chiriladi
+        with scratch.job_dir(f"report_{test_data.id}") as report_dir:
+            excel_path = await asyncio.to_thread(
+                create_full_participant_report_pandas,
+                test_data.title,
+                sorted_results,
+                creator_name,
+                test_data.answer,
+                report_dir
+            )
+
+            if excel_path and os.path.exists(excel_path):
+                try:
+                    await send_scheduler.send(creator_chat_id, functools.partial(
+                        bot.send_document,
+                        chat_id=creator_chat_id,
+                        document=FSInputFile(excel_path),
+                        caption=f"📝 '{test_data.title}' testi bo'yicha ishtirokchilarning to'liq hisoboti.",
+                        parse_mode='HTML',
+                    ))
+                    logger.info(f"Excel report for test {test_data.id} sent to creator {creator_chat_id}.")
+                except Exception as e:
+                    await bot.send_message(creator_chat_id, "Hisobot faylini yuborishda xatolik yuz berdi ‼️")
+                    logger.error(f"Error sending Excel report: {e}")
+            else:
+                await bot.send_message(creator_chat_id,
+                                       "Hisobot faylini yaratishda xatolik yuz berdi. Iltimos, adminga murojaat qiling.")
+
+    # Yetkazish holatini outbox jadvalidan kuzatamiz
+    while True:
+        async with outbox.session_factory() as session:
+            job.done, job.total = await get_batch_progress(session, reports_batch_key)
+        if job.done >= job.total:
+            break
+        await progress.update(job.done, job.total)
+        await asyncio.sleep(PROGRESS_EDIT_INTERVAL)
+
+    progress.template = "✅ Shaxsiy hisobotlar yuborildi: {done}/{total}"
+    await progress.update(job.done, job.total, force=True)
+
+
 @router.callback_query(F.data.startswith("cert_nav"), CheckStates.waiting_for_pagination)
-async def handle_cert_navigation(callback: CallbackQuery, state: FSMContext, bot: Bot):
+async def handle_cert_navigation(callback: CallbackQuery, state: FSMContext, bot: Bot,
+                                 session_factory: async_sessionmaker[AsyncSession]):
     parts = callback.data.split(":")
 
     if len(parts) != 3:
@@ -790,6 +1152,7 @@ async def handle_cert_navigation(callback: CallbackQuery, state: FSMContext, bot
                 bot=bot,
                 chat_id=callback.message.chat.id,
                 current_index=new_index,
+                session_factory=session_factory,
                 msg_id=cert_msg_id
             )
 
@@ -806,15 +1169,58 @@ async def handle_cert_navigation(callback: CallbackQuery, state: FSMContext, bot
         await callback.answer()
 
 
+async def send_certificates_individually(bot: Bot, chat_id: int, cert_pool: CertificateRenderPool,
+                                         cert_jobs: List[Dict[str, Any]], test_title: str,
+                                         image_dir: Optional[str] = None, image_format: str = "png") -> int:
+    """
+    PDF yuborib bo'lmaganda sertifikatlarni birma-bir yuboradi. Rasm nusxalar saqlangan bo'lsa
+    ular ishlatiladi, aks holda sahifalar xotirada qayta chiziladi (JPEG).
+    """
+    def saved_image(job) -> Optional[str]:
+        if not image_dir:
+            return None
+        path = os.path.join(image_dir, image_file_name(job['rank'], image_format))
+        return path if os.path.exists(path) else None
+
+    sent = 0
+    total = len(cert_jobs)
+    jobs_to_render = [job for job in cert_jobs if not saved_image(job)]
+    rendered = cert_pool.imap(render_certificate_page, jobs_to_render)
+
+    for idx, job in enumerate(cert_jobs, 1):
+        image_path = saved_image(job)
+        if image_path:
+            document = FSInputFile(image_path)
+        else:
+            page = await rendered.__anext__()
+            if isinstance(page, (str, Exception)):
+                continue
+            document = BufferedInputFile(page[0], filename=f"sertifikat_{job['rank']}.jpg")
+        try:
+            await send_scheduler.send(chat_id, functools.partial(
+                bot.send_document,
+                chat_id=chat_id,
+                document=document,
+                caption=f"🏆 Sertifikat {idx}/{total} — {test_title}",
+                request_timeout=60,
+            ))
+            sent += 1
+        except Exception as e:
+            logger.error(f"Alohida sertifikat {idx} yuborishda xato: {e}")
+    await rendered.aclose()
+    return sent
+
+
 @router.callback_query(F.data.startswith("cert_select"), CheckStates.waiting_for_pagination)
-async def handle_cert_selection(callback: CallbackQuery, state: FSMContext, bot: Bot):
+async def handle_cert_selection(callback: CallbackQuery, state: FSMContext, bot: Bot,
+                                cert_pool: CertificateRenderPool, config: Config, scratch: ScratchSpace,
+                                session_factory: async_sessionmaker[AsyncSession]):
     selected_cert_id_raw = callback.data.split(":")[1]
     selected_cert_id = int(selected_cert_id_raw)
     data = await state.get_data()
     cert_msg_id = data.get('cert_msg_id')
-    final_certs_data = []
     error_messages = []
-    creation_tasks = []
+    cert_jobs = []
     try:
         await bot.delete_message(callback.message.chat.id, cert_msg_id)
     except Exception as e:
@@ -827,145 +1233,114 @@ async def handle_cert_selection(callback: CallbackQuery, state: FSMContext, bot:
         await callback.message.answer("Sertifikat yaratish bekor qilindi.", reply_markup=mainMenu)
         return
 
+    # Tanlovlar soni keyingi ishga tushishda qaysi shablonlarni oldindan yuklashni belgilaydi
+    try:
+        async with session_factory() as session:
+            await record_template_selection(session, selected_cert_id)
+    except Exception as e:
+        logger.warning(f"Shablon tanlovini saqlashda xato: {e}")
+
     results: List[Tuple] = data.get('all_results', [])
     test_title: str = data.get('test_title', "Fan")
     creator_name: str = data.get('creator_name', "Noaniq O'qituvchi")
     test_code: str = data.get('test_code', "Noma'lum")
     sorted_results = sorted(results, key=lambda x: (x[4], x[4] / x[5] if x[5] else 0), reverse=True)
-    created_certs = []
 
-    for rank_idx, res in enumerate(sorted_results):
-        user_id_res, first_name, last_name, _, correct, total, _ = res
-        full_name = f"{first_name} {last_name or ''}".strip()
-        result_percent = round((correct / total) * 100) if total else 0
-        rank = rank_idx + 1
-        task = asyncio.to_thread(
-            # create_certificate() sinxron funksiyasini yuboramiz:
-            create_certificate,
-            generator_id=selected_cert_id,
-            full_name=full_name,
-            subject=test_title,
-            result_percent=result_percent,
-            rank=rank,
-            teacher_name=creator_name
-        )
-        creation_tasks.append((user_id_res, task))
-
-    cert_results = await asyncio.gather(*[task for user_id, task in creation_tasks], return_exceptions=True)
-
-    for i, result in enumerate(cert_results):
-        user_id = creation_tasks[i][0]
-
-        if isinstance(result, str) and not result.startswith('❌'):
-            # Muvaffaqiyatli fayl yo'li
-            final_certs_data.append((user_id, result))
-        elif isinstance(result, str) and result.startswith('❌'):
-            # create_certificate() ichidan kelgan xato xabari
-            error_messages.append(f"❌ ID {user_id} uchun sertifikatda xato: {result.split(':')[-1].strip()}")
-        elif isinstance(result, Exception):
-            # Kutilmagan Python xatosi
-            logger.error(f"ID {user_id} uchun kutilmagan Python xatosi: {result}")
-            error_messages.append(f"❌ Kutilmagan xato: {user_id}")
-
-    temp_cert_paths = [path for user_id, path in final_certs_data]
-    if temp_cert_paths:
-        await callback.message.answer(
-            f"✅ Jami {len(temp_cert_paths)} ta sertifikat yaratildi. PDF shaklida yuborilmoqda...")
+    # Har bir ish alohida vaqtinchalik papkada — ish tugashi yoki xato bilan to'xtashi bilan o'chiriladi
+    with scratch.job_dir(f"certs_{callback.from_user.id}") as temp_dir:
+        # Asl o'lchamdagi rasm nusxalar faqat sozlamada yoqilgan bo'lsa saqlanadi
+        image_format = config.render.cert_image_output
+        image_dir = os.path.join(temp_dir, "images") if image_format else None
+
+        for rank_idx, res in enumerate(sorted_results):
+            user_id_res, first_name, last_name, _, correct, total, _ = res
+            full_name = f"{first_name} {last_name or ''}".strip()
+            result_percent = round((correct / total) * 100) if total else 0
+            rank = rank_idx + 1
+            cert_jobs.append(dict(
+                generator_id=selected_cert_id,
+                full_name=full_name,
+                subject=test_title,
+                result_percent=result_percent,
+                rank=rank,
+                teacher_name=creator_name,
+                image_output_dir=image_dir,
+                image_format=image_format or "png",
+            ))
 
-        # Har bir admin uchun alohida papka — bir vaqtda ikkita admin ishlasa fayllari aralashmasin
-        temp_dir = f"temp_certs_{callback.from_user.id}"
-        os.makedirs(temp_dir, exist_ok=True)
         pdf_filename = f"Sertifikatlar_{test_code}.pdf"
         output_pdf_path = os.path.join(temp_dir, pdf_filename)
+        # Telegram limitiga yetganda PDF avtomatik ravishda keyingi jildga ("_part2") o'tadi
+        writer = MultiVolumePdfWriter(output_pdf_path, TELEGRAM_MAX_FILE_SIZE_BYTES, dpi=PDF_DPI)
+        page_jobs = []  # PDF'ga tushgan sahifalar tartibida
 
-        # combine_images_to_pdf_sync ni to_thread orqali chaqirish
-        pdf_path = await asyncio.to_thread(
-            combine_images_to_pdf_sync,
-            temp_cert_paths,
-            output_pdf_path
-        )
-
-        # 4. Yuborish va Tozalash
-        if pdf_path and isinstance(pdf_path, str) and pdf_path.startswith("TOO_LARGE:"):
-            # PDF hajmi Telegram limitidan katta
-            pdf_size_mb = int(pdf_path.split(":")[1]) // 1024 // 1024
-            logger.error(f"PDF {pdf_size_mb} MB — Telegram limiti (49 MB) oshdi, yuborilmadi.")
-            await callback.message.answer(
-                f"⚠️ Sertifikatlar PDF fayli juda katta ({pdf_size_mb} MB).\n"
-                f"Telegram 50 MB dan katta fayllarni qabul qilmaydi.\n\n"
-                f"Sertifikatlar alohida-alohida yuboriladi...",
-            )
-            # Sertifikatlarni alohida yuborish (bo'laklab)
-            sent = 0
-            for idx, cert_path in enumerate(temp_cert_paths, 1):
-                if not os.path.exists(cert_path):
-                    continue
-                try:
-                    await bot.send_document(
-                        chat_id=callback.from_user.id,
-                        document=FSInputFile(cert_path),
-                        caption=f"🏆 Sertifikat {idx}/{len(temp_cert_paths)} — {test_title}",
-                    )
-                    sent += 1
-                    if idx % 15 == 0:
-                        await asyncio.sleep(1)  # Rate limit uchun pauza
-                except Exception as e:
-                    logger.error(f"Sertifikat {idx} yuborishda xato: {e}", exc_info=True)
-            await callback.message.answer(f"✅ {sent} ta sertifikat alohida yuborildi.")
+        try:
+            # Sertifikatlar jarayonlar havzasida xotirada chiziladi va JPEG sahifa sifatida
+            # to'g'ridan-to'g'ri PDF'ga yoziladi — oraliq PNG fayllar yo'q
+            job_index = 0
+            async for page in cert_pool.imap(render_certificate_page, cert_jobs):
+                user_id = sorted_results[job_index][0]
+                job = cert_jobs[job_index]
+                job_index += 1
+
+                if isinstance(page, tuple):
+                    await asyncio.to_thread(writer.add_jpeg_page, *page)
+                    page_jobs.append(job)
+                elif isinstance(page, str):
+                    # render_certificate_page() ichidan kelgan xato xabari
+                    error_messages.append(f"❌ ID {user_id} uchun sertifikatda xato: {page.split(':')[-1].strip()}")
+                else:
+                    # Kutilmagan Python xatosi
+                    logger.error(f"ID {user_id} uchun kutilmagan Python xatosi: {page}")
+                    error_messages.append(f"❌ Kutilmagan xato: {user_id}")
 
-        elif pdf_path and os.path.exists(pdf_path):
-            try:
-                pdf_size_mb = os.path.getsize(pdf_path) // 1024 // 1024
-                await bot.send_document(
-                    chat_id=callback.from_user.id,
-                    document=FSInputFile(pdf_path),
-                    caption=f"📄 Barcha {len(temp_cert_paths)} ta sertifikatlar <b>{test_title}</b> testi uchun bitta PDF faylda. ({pdf_size_mb} MB)",
-                    parse_mode='HTML',
-                    request_timeout=300,  # 5 daqiqa — katta fayllar uchun
-                )
-                logger.info(f"PDF ({pdf_size_mb} MB) muvaffaqiyatli yuborildi: creator={callback.from_user.id}")
-            except Exception as e:
-                logger.error(f"PDF yuborishda xato: {type(e).__name__}: {e}", exc_info=True)
+            if page_jobs:
+                volumes = writer.close()
+                page_count = len(page_jobs)
                 await callback.message.answer(
-                    "⚠️ PDF yuborishda xato yuz berdi (tarmoq muammosi yoki timeout).\n"
-                    "Sertifikatlar alohida-alohida yuboriladi..."
-                )
-                # Fallback: har bir sertifikatni alohida yuborish
-                sent = 0
-                for idx, cert_path in enumerate(temp_cert_paths, 1):
-                    if not os.path.exists(cert_path):
-                        continue
+                    f"✅ Jami {page_count} ta sertifikat yaratildi. PDF shaklida yuborilmoqda..."
+                    + (f"\n📚 Fayl hajmi katta bo'lgani uchun {len(volumes)} qismga bo'lindi." if len(volumes) > 1 else ""))
+
+                first_page = 0
+                for volume_no, (volume_path, volume_pages) in enumerate(zip(volumes, writer.volume_page_counts), 1):
+                    volume_jobs = page_jobs[first_page:first_page + volume_pages]
+                    first_page += volume_pages
+                    pdf_size_mb = os.path.getsize(volume_path) // 1024 // 1024
+                    part_note = f" — {volume_no}/{len(volumes)}-qism" if len(volumes) > 1 else ""
                     try:
-                        await bot.send_document(
+                        await send_scheduler.send(callback.from_user.id, functools.partial(
+                            bot.send_document,
                             chat_id=callback.from_user.id,
-                            document=FSInputFile(cert_path),
-                            caption=f"🏆 Sertifikat {idx}/{len(temp_cert_paths)} — {test_title}",
-                            request_timeout=60,
+                            document=FSInputFile(volume_path),
+                            caption=f"📄 {volume_pages} ta sertifikat <b>{test_title}</b> testi uchun{part_note}. ({pdf_size_mb} MB)",
+                            parse_mode='HTML',
+                            request_timeout=300,  # 5 daqiqa — katta fayllar uchun
+                        ))
+                        logger.info(f"PDF ({pdf_size_mb} MB) muvaffaqiyatli yuborildi: creator={callback.from_user.id}")
+                    except Exception as e:
+                        logger.error(f"PDF yuborishda xato: {type(e).__name__}: {e}", exc_info=True)
+                        await callback.message.answer(
+                            "⚠️ PDF yuborishda xato yuz berdi (tarmoq muammosi yoki timeout).\n"
+                            "Shu qismdagi sertifikatlar alohida-alohida yuboriladi..."
                         )
-                        sent += 1
-                        if idx % 15 == 0:
-                            await asyncio.sleep(1)
-                    except Exception as e2:
-                        logger.error(f"Alohida sertifikat {idx} yuborishda xato: {e2}")
-                if sent > 0:
-                    await callback.message.answer(f"✅ {sent}/{len(temp_cert_paths)} ta sertifikat alohida yuborildi.")
-                else:
-                    await callback.message.answer("❌ Sertifikatlarni yuborib bo'lmadi. Loglarni tekshiring.")
-        else:
-            logger.error(f"PDF fayl topilmadi: {pdf_path}")
+                        # Fallback: faqat shu jilddagi sertifikatlarni alohida yuborish
+                        sent = await send_certificates_individually(
+                            bot, callback.from_user.id, cert_pool, volume_jobs, test_title,
+                            image_dir, image_format or "png"
+                        )
+                        if sent > 0:
+                            await callback.message.answer(f"✅ {sent}/{volume_pages} ta sertifikat alohida yuborildi.")
+                        else:
+                            await callback.message.answer("❌ Sertifikatlarni yuborib bo'lmadi. Loglarni tekshiring.")
+            else:
+                writer.abort()
+                await callback.message.answer("Natijalar bo'yicha sertifikat yaratilmadi. Ehtimol xato yuz berdi.",
+                                              reply_markup=mainMenu)
+        except Exception as e:
+            writer.abort()
+            logger.error(f"Sertifikatlar PDF'ini yaratishda xato: {e}", exc_info=True)
             await callback.message.answer("⚠️ PDF yaratishda xato yuz berdi. Loglarni tekshiring.")
 
-        # Fayllar va papkani o'chirish (try...finally emas, balki qulaylik uchun oxirida)
-        if os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-                logger.info(f"Temp certs directory removed: {temp_dir}")
-            except Exception as e:
-                logger.error(f"Vaqtinchalik papkani o'chirishda xato: {e}")
-    else:
-        await callback.message.answer("Natijalar bo'yicha sertifikat yaratilmadi. Ehtimol xato yuz berdi.",
-                                      reply_markup=mainMenu)
-
     if error_messages:
         await callback.message.answer(
             f"⚠️ Ba'zi sertifikatlarni yaratishda xatoliklar yuz berdi:\n" + "\n".join(error_messages[:5]),
@@ -10,3 +10,6 @@ class CheckStates(StatesGroup):
     waiting_for_finish_code = State()
     waiting_for_template_selection = State()
     waiting_for_pagination = State()
+    waiting_for_regrade_code = State()
+    waiting_for_regrade_key = State()
+    waiting_for_key_fix = State()
@@ -1,2 +1,14 @@
 from . import excel_generator
-from . import sertifikat_generator
\ No newline at end of file
+from . import sertifikat_generator
+from . import answer_key
+from . import item_analysis
+from . import background_jobs
+from . import send_scheduler
+from . import outbox_worker
+from . import leaderboard
+from . import result_digest
+from . import cert_renderer
+from . import pdf_writer
+from . import cert_cache
+from . import scratch_space
+from . import cert_registry
\ No newline at end of file
@@ -0,0 +1,80 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Kalit savol raqami bo'yicha indekslangan bayt massivi sifatida saqlanadi:
+# key[5] == ord('b') — 5-savolning javobi "b". 0 — "bu raqamli savol yo'q".
+NO_ANSWER = 0
+MAX_QUESTION_NUMBER = 1000  # Kalitdagi eng katta savol raqami
+
+ANSWER_PAIR_PATTERN = re.compile(r'(\d+)([a-z])')
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1024)
+def compile_answer_key(answer_key_raw: str) -> bytes:
+    """
+    Test kalitini ("1a2b3c...") bir marta tahlil qilib, savol raqami bo'yicha
+    indekslangan bayt massiviga aylantiradi. Natija kesh qilinadi — bir xil
+    kalit bilan kelgan minglab javoblar qayta regex ishlatmaydi.
+    MAX_QUESTION_NUMBER faqat yangi kalit kiritilganda tekshiriladi. Bu cheklovdan oldin
+    saqlangan, kattaroq raqamli kalitlar qisqartirilmaydi — ogohlantirish yoziladi xolos.
+    """
+    pairs = [(int(num), letter) for num, letter in ANSWER_PAIR_PATTERN.findall(answer_key_raw.lower())]
+    too_large = sorted(num for num, _ in pairs if num > MAX_QUESTION_NUMBER)
+    if too_large:
+        logger.warning(f"Kalitda {MAX_QUESTION_NUMBER} dan katta savol raqamlari bor (eski kalit): {too_large[:10]}")
+    if not pairs:
+        return b''
+
+    compiled = bytearray(max(num for num, _ in pairs) + 1)
+    for num, letter in pairs:
+        compiled[num] = ord(letter)
+    return bytes(compiled)
+
+
+def parse_user_answers(user_answers_raw: str, length: int) -> bytes:
+    """Foydalanuvchi javoblarini kalit uzunligidagi bayt massiviga joylaydi."""
+    compiled = bytearray(length)
+    for num, letter in ANSWER_PAIR_PATTERN.findall(user_answers_raw.lower()):
+        num = int(num)
+        if num < length:
+            compiled[num] = ord(letter)
+    return bytes(compiled)
+
+
+def count_questions(compiled_key: bytes) -> int:
+    return len(compiled_key) - compiled_key.count(NO_ANSWER)
+
+
+def grade_answers(compiled_key: bytes, user_answers: bytes) -> int:
+    """To'g'ri javoblar sonini qaytaradi (bo'sh savollar hisobga olinmaydi)."""
+    return sum(1 for correct, given in zip(compiled_key, user_answers) if correct and correct == given)
+
+
+def iter_answers(compiled_key: bytes) -> Iterator[Tuple[int, str]]:
+    """(savol_raqami, javob_harfi) juftliklarini tartib bilan qaytaradi."""
+    for q_num, answer in enumerate(compiled_key):
+        if answer != NO_ANSWER:
+            yield q_num, chr(answer)
+
+
+def max_question_number(answer_key_raw: str) -> int:
+    numbers = [int(num) for num, _ in ANSWER_PAIR_PATTERN.findall(answer_key_raw.lower())]
+    return max(numbers) if numbers else 0
+
+
+def build_answer_matrix(user_answers_list: List[Optional[str]], length: int) -> np.ndarray:
+    """Ishtirokchilar × savollar o'lchamdagi uint8 matritsa (javob yo'q — 0)."""
+    buffer = b''.join(parse_user_answers(raw or '', length) for raw in user_answers_list)
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(len(user_answers_list), length)
+
+
+def grade_matrix(compiled_key: bytes, answers: np.ndarray) -> np.ndarray:
+    """Har bir ishtirokchining to'g'ri javoblar sonini bitta vektor amalida hisoblaydi."""
+    key = np.frombuffer(compiled_key, dtype=np.uint8)
+    return ((answers == key) & (key != NO_ANSWER)).sum(axis=1)
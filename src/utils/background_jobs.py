@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EDIT_INTERVAL = 3.0  # Progress xabari ko'pi bilan shuncha soniyada bir marta tahrirlanadi
+
+
+@dataclass
+class BackgroundJob:
+    job_id: str
+    title: str
+    total: int = 0
+    done: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+# Ishlayotgan fon vazifalari. Task'larga kuchli havola saqlanadi — aks holda
+# asyncio ularni yakunlanmasdan turib garbage collector orqali yo'qotishi mumkin.
+_jobs: Dict[str, BackgroundJob] = {}
+
+
+def get_job(job_id: str) -> Optional[BackgroundJob]:
+    job = _jobs.get(job_id)
+    return job if job and job.is_running else None
+
+
+def start_job(job_id: str, title: str, job_func: Callable[[BackgroundJob], Awaitable[None]]) -> BackgroundJob:
+    """job_func(job) korutinasini fon vazifasi sifatida ishga tushiradi va kuzatib boradi."""
+    if get_job(job_id):
+        raise RuntimeError(f"Job {job_id} is already running")
+
+    job = BackgroundJob(job_id=job_id, title=title)
+
+    def _on_done(task: asyncio.Task):
+        _jobs.pop(job_id, None)
+        elapsed = time.monotonic() - job.started_at
+        if task.cancelled():
+            logger.warning(f"Fon vazifasi bekor qilindi: {job_id} ({job.done}/{job.total})")
+        elif task.exception():
+            logger.error(f"Fon vazifasida xato: {job_id}", exc_info=task.exception())
+        else:
+            logger.info(f"Fon vazifasi yakunlandi: {job_id} ({job.done}/{job.total}) {elapsed:.1f}s")
+
+    job.task = asyncio.create_task(job_func(job), name=job_id)
+    job.task.add_done_callback(_on_done)
+    _jobs[job_id] = job
+    logger.info(f"Fon vazifasi boshlandi: {job_id} — {title}")
+    return job
+
+
+class ProgressMessage:
+    """Bitta xabarni joyida tahrirlab boradi ("412/2000 ta hisobot yuborildi")."""
+
+    def __init__(self, bot: Bot, chat_id: int, message_id: int, template: str):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.template = template
+        self._last_edit = 0.0
+        self._last_text = None
+
+    async def update(self, done: int, total: int, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_edit < PROGRESS_EDIT_INTERVAL:
+            return
+
+        text = self.template.format(done=done, total=total)
+        if text == self._last_text:
+            return
+        try:
+            await self.bot.edit_message_text(text=text, chat_id=self.chat_id, message_id=self.message_id)
+            self._last_text = text
+            self._last_edit = now
+        except TelegramBadRequest as e:
+            # "message is not modified" va shunga o'xshash zararsiz xatolar
+            logger.debug(f"Progress xabarini tahrirlab bo'lmadi: {e}")
+        except Exception as e:
+            logger.warning(f"Progress xabarini tahrirlashda xato: {e}")
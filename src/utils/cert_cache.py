@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+CERT_CACHE_VERSION = 1  # Chizish kodi o'zgarsa oshiriladi (sozlama va fayllar kalitga o'zi kiradi)
+CERT_CACHE_SWEEP_EVERY_BYTES = 32 * 1024 * 1024  # Shuncha yozilgandan keyin hajm tekshiriladi
+
+
+def render_fingerprint(settings: Dict[str, Any], files: Iterable[str]) -> str:
+    """
+    Chizishga ta'sir qiluvchi hamma narsaning xeshi: sozlamalar (koordinatalar, shrift
+    o'lchamlari, ranglar ...) va fayllar (shablon, shriftlar) — hajmi va o'zgartirilgan vaqti.
+    Ulardan biri o'zgarsa, keshdagi eski sahifalar ishlatilmaydi.
+    """
+    file_signatures = []
+    for path in files:
+        try:
+            stat = os.stat(path)
+            file_signatures.append([path, stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            file_signatures.append([path, None, None])
+    payload = json.dumps([settings, file_signatures], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def certificate_cache_key(generator_id: int, fingerprint: str, full_name: str, subject: str,
+                          result_percent: float, rank: int, teacher_name: str,
+                          profile: Sequence, scale: float, jpeg_quality: int) -> str:
+    """
+    Sertifikat kirish ma'lumotlari, chizish sozlamalari (render_fingerprint) va chizish
+    profilidan (RenderProfile — nomi va o'lcham chegarasi, masshtab, JPEG sifati) barqaror kalit (sha256).
+    """
+    payload = json.dumps([
+        CERT_CACHE_VERSION, generator_id, fingerprint, profile, scale, jpeg_quality,
+        full_name, subject, result_percent, rank, teacher_name
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CertificateCache:
+    """
+    Tayyor sertifikatlar (PDF sahifasi JPEG baytlari) uchun diskdagi kesh.
+    Fayl nomi — kirish ma'lumotlarining xeshi, shuning uchun bir nechta jarayon
+    bir papkadan xavfsiz foydalanadi. Hajm `max_bytes` dan oshsa, eng uzoq vaqt
+    ishlatilmagan fayllar o'chiriladi (LRU, fayl mtime bo'yicha).
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ".jpg"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._written_since_sweep = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # LRU: oxirgi foydalanish vaqti
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Sertifikat keshini o'qishda xato {path}: {e}")
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)  # Boshqa jarayon chala faylni o'qimasligi uchun
+        except OSError as e:
+            logger.warning(f"Sertifikat keshiga yozishda xato {path}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._written_since_sweep += len(data)
+            need_sweep = self._written_since_sweep >= min(CERT_CACHE_SWEEP_EVERY_BYTES, self.max_bytes)
+            if need_sweep:
+                self._written_since_sweep = 0
+        if need_sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Kesh hajmini `max_bytes` gacha kamaytiradi: eng eski (mtime) fayllar birinchi o'chiriladi."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        logger.info(f"Sertifikat keshidan {removed} ta eski fayl o'chirildi, hajmi {total // 1024 // 1024} MB")
+
+
+_certificate_cache: Optional[CertificateCache] = None
+
+
+def configure_certificate_cache(directory: Optional[str], max_bytes: int):
+    """Jarayon uchun keshni sozlaydi; `max_bytes` 0 bo'lsa kesh o'chiriladi."""
+    global _certificate_cache
+    _certificate_cache = CertificateCache(directory, max_bytes) if directory and max_bytes > 0 else None
+
+
+def get_certificate_cache() -> Optional[CertificateCache]:
+    return _certificate_cache
@@ -0,0 +1,118 @@
+import glob
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from PIL import ImageColor
+
+logger = logging.getLogger(__name__)
+
+CERT_ASSETS_DIR = "sertifikatlar"
+CERT_MANIFESTS_DIR = os.path.join(CERT_ASSETS_DIR, "manifests")
+
+
+class CertificateManifestError(ValueError):
+    """Shablon manifesti noto'g'ri yoki unga tegishli fayl topilmadi."""
+
+
+@dataclass(frozen=True)
+class TextStyle:
+    font_file: str
+    font_size: int
+    color: str
+
+
+@dataclass(frozen=True)
+class TemplateManifest:
+    """Bitta shablonning tayyor (tekshirilgan) chizish rejasi: fayl yo'llari, shriftlar, koordinatalar."""
+    id: int
+    title: str
+    template_file: str
+    preview_file: str
+    student: TextStyle
+    student_y: int
+    teacher: TextStyle
+    teacher_xy: Tuple[int, int]
+    congrats: TextStyle
+    congrats_y: int
+    congrats_max_width: int
+    line_spacing: int
+
+
+def _require(data: Dict[str, Any], key: str, kind, source: str):
+    value = data.get(key)
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise CertificateManifestError(f"{source}: '{key}' maydoni {kind.__name__} bo'lishi kerak, berilgan: {value!r}")
+    if kind is int and value < 0:
+        raise CertificateManifestError(f"{source}: '{key}' manfiy bo'lmasligi kerak")
+    return value
+
+
+def _asset_path(name: str, source: str) -> str:
+    path = os.path.join(CERT_ASSETS_DIR, name)
+    if not os.path.isfile(path):
+        raise CertificateManifestError(f"{source}: fayl topilmadi: {path}")
+    return path
+
+
+def _text_style(data: Dict[str, Any], source: str) -> TextStyle:
+    color = _require(data, "color", str, source)
+    try:
+        ImageColor.getrgb(color)
+    except ValueError:
+        raise CertificateManifestError(f"{source}: noto'g'ri rang: {color!r}")
+    return TextStyle(
+        font_file=_asset_path(_require(data, "font", str, source), source),
+        font_size=_require(data, "size", int, source),
+        color=color,
+    )
+
+
+def parse_manifest(data: Dict[str, Any], source: str) -> TemplateManifest:
+    student = _require(data, "student", dict, source)
+    teacher = _require(data, "teacher", dict, source)
+    congrats = _require(data, "congrats", dict, source)
+    return TemplateManifest(
+        id=_require(data, "id", int, source),
+        title=_require(data, "title", str, source),
+        template_file=_asset_path(_require(data, "template", str, source), source),
+        preview_file=_asset_path(_require(data, "preview", str, source), source),
+        student=_text_style(student, f"{source} [student]"),
+        student_y=_require(student, "y", int, f"{source} [student]"),
+        teacher=_text_style(teacher, f"{source} [teacher]"),
+        teacher_xy=(_require(teacher, "x", int, f"{source} [teacher]"),
+                    _require(teacher, "y", int, f"{source} [teacher]")),
+        congrats=_text_style(congrats, f"{source} [congrats]"),
+        congrats_y=_require(congrats, "y", int, f"{source} [congrats]"),
+        congrats_max_width=_require(congrats, "max_width", int, f"{source} [congrats]"),
+        line_spacing=_require(congrats, "line_spacing", int, f"{source} [congrats]"),
+    )
+
+
+def load_manifests(manifests_dir: str = CERT_MANIFESTS_DIR) -> Dict[int, TemplateManifest]:
+    """
+    Papkadagi barcha `*.json` manifestlarni o'qiydi va tekshiradi (ishga tushishda bir marta).
+    Xato bo'lsa CertificateManifestError ko'tariladi — noto'g'ri shablon bilan bot ishga tushmaydi.
+    Rasm va shriftlar bu yerda yuklanmaydi, faqat mavjudligi tekshiriladi.
+    """
+    manifests: Dict[int, TemplateManifest] = {}
+    for path in sorted(glob.glob(os.path.join(manifests_dir, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CertificateManifestError(f"{path}: manifestni o'qib bo'lmadi: {e}")
+        if not isinstance(data, dict):
+            raise CertificateManifestError(f"{path}: manifest JSON obyekt bo'lishi kerak")
+
+        manifest = parse_manifest(data, path)
+        if manifest.id in manifests:
+            raise CertificateManifestError(f"{path}: shablon ID {manifest.id} takrorlangan")
+        manifests[manifest.id] = manifest
+
+    if not manifests:
+        raise CertificateManifestError(f"{manifests_dir}: birorta ham shablon manifesti topilmadi")
+    logger.info(f"Sertifikat shablonlari ro'yxati yuklandi: {len(manifests)} ta")
+    return dict(sorted(manifests.items()))
@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional
+
+from src.utils.cert_cache import configure_certificate_cache
+
+logger = logging.getLogger(__name__)
+
+RENDER_QUEUE_PER_WORKER = 2  # Har bir jarayonga navbatda turadigan vazifalar soni
+
+
+def _worker_init(cache_dir: Optional[str], cache_max_bytes: int, warm_up: Optional[Callable[[], Any]]):
+    # Har bir jarayon o'z shrift va shablon keshini saqlaydi — jarayon tirik ekan ular "issiq" qoladi
+    logging.basicConfig(level=logging.INFO)
+    configure_certificate_cache(cache_dir, cache_max_bytes)
+    if warm_up is not None:
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning(f"Jarayonni oldindan qizdirishda xato: {e}")
+
+
+def _ping() -> bool:
+    return True
+
+
+class CertificateRenderPool:
+    """
+    Sertifikatlarni alohida jarayonlarda chizadi. Pillow'da matn chizish va
+    PNG siqish CPU'ni band qiladi, shuning uchun threadlar o'rniga jarayonlar
+    ishlatiladi. Bir vaqtda ko'pi bilan `workers * RENDER_QUEUE_PER_WORKER`
+    vazifa yuboriladi, qolganlari navbat bo'shashini kutadi.
+    """
+
+    def __init__(self, workers: int, queue_per_worker: int = RENDER_QUEUE_PER_WORKER,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 0):
+        self.workers = max(1, workers)
+        self.queue_size = self.workers * queue_per_worker
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self._warm_up: Optional[Callable[[], Any]] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" — event loop va ochiq ulanishlar bolalar jarayoniga ko'chirilmaydi
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+                initargs=(self.cache_dir, self.cache_max_bytes, self._warm_up),
+            )
+            logger.info(f"Sertifikat jarayonlar havzasi ishga tushdi: {self.workers} ta jarayon")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, **kwargs))
+        except BrokenProcessPool:
+            # Jarayon kutilmaganda o'lgan bo'lsa, havza qayta yaratiladi
+            logger.error("Sertifikat jarayonlar havzasi buzildi, qayta yaratilmoqda.")
+            self.shutdown(wait=False)
+            raise
+
+    async def imap(self, func: Callable[..., Any], kwargs_list: Iterable[Dict[str, Any]]
+                   ) -> AsyncIterator[Any]:
+        """
+        `func(**kwargs)` natijalarini kirish tartibida birma-bir qaytaradi; xatolar
+        istisno obyekti sifatida qaytariladi. Bir vaqtda ko'pi bilan `queue_size` ta
+        vazifa bajariladi — iste'molchi sekin bo'lsa, yangi vazifa yuborilmaydi.
+        """
+        window: Deque[asyncio.Future] = deque()
+
+        async def _result(future: asyncio.Future) -> Any:
+            try:
+                return await future
+            except Exception as e:
+                return e
+
+        try:
+            for kwargs in kwargs_list:
+                window.append(asyncio.ensure_future(self.run(func, **kwargs)))
+                if len(window) >= self.queue_size:
+                    yield await _result(window.popleft())
+            while window:
+                yield await _result(window.popleft())
+        finally:
+            for future in window:
+                future.cancel()
+
+    async def warm_up(self, warm_up: Callable[[], Any]):
+        """
+        Barcha jarayonlarni oldindan ishga tushiradi va har birida `warm_up()` ni bajaradi
+        (jarayon qayta yaratilsa ham). Fon vazifasi sifatida chaqiriladi — bot kutmaydi.
+        """
+        self._warm_up = warm_up
+        if self._executor is not None:
+            # Havza allaqachon ishlayapti — sozlama keyingi qayta yaratishda qo'llanadi
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        # Har bir vazifa yangi jarayon ochadi (max_workers gacha), initializer qizdirishni bajaradi
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _ping) for _ in range(self.workers)), return_exceptions=True
+        )
+        failed = sum(1 for result in results if isinstance(result, BaseException))
+        if failed:
+            logger.warning(f"Sertifikat jarayonlarini qizdirishda {failed} ta xato")
+        else:
+            logger.info(f"Sertifikat jarayonlari oldindan qizdirildi: {self.workers} ta")
+
+    async def map(self, func: Callable[..., Any], kwargs_list: Iterable[Dict[str, Any]]) -> List[Any]:
+        return [result async for result in self.imap(func, kwargs_list)]
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -1,9 +1,13 @@
 import pandas as pd
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
+from openpyxl.utils import get_column_letter
 import os
 import logging
 import time
 
+from src.utils.answer_key import compile_answer_key
+from src.utils.item_analysis import compute_item_analysis
+
 logger = logging.getLogger(__name__)
 
 
@@ -11,9 +15,10 @@ def create_full_participant_report_pandas(
         test_title: str,
         # Tuple tipi endi user_answers_key (str) ni ham o'z ichiga oladi
         results: List[Tuple[int, str, str, str, int, int, str]],
-        creator_name: str
+        creator_name: str,
+        answer_key: Optional[str] = None,
+        output_dir: str = 'reports'
 ) -> str:
-    output_dir = 'reports'
     os.makedirs(output_dir, exist_ok=True)
 
     # 2. Fayl nomini yaratish
@@ -104,6 +109,18 @@ def create_full_participant_report_pandas(
             # Excel ustunlari A, B, C...
             worksheet.column_dimensions[chr(ord('A') + i)].width = max_len
 
+        # Ikkinchi varaq: savollar bo'yicha tahlil (qiyinlik, farqlash, harflar taqsimoti)
+        if answer_key:
+            analysis_df = compute_item_analysis(
+                compile_answer_key(answer_key),
+                [user_answers_key for *_, user_answers_key in results]
+            )
+            if not analysis_df.empty:
+                analysis_df.to_excel(writer, sheet_name='Savollar tahlili', index=False)
+                analysis_sheet = writer.sheets['Savollar tahlili']
+                for i, col in enumerate(analysis_df.columns, 1):
+                    analysis_sheet.column_dimensions[get_column_letter(i)].width = len(str(col)) + 4
+
         writer.close()
 
         logger.info(f"Pandas Excel report created successfully at {file_path}")
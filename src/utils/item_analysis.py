@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+from src.utils.answer_key import build_answer_matrix, NO_ANSWER
+
+# Farqlash indeksi uchun yuqori va quyi guruh ulushi (klassik 27% qoidasi)
+DISCRIMINATION_GROUP_SHARE = 0.27
+
+
+def compute_item_analysis(compiled_key: bytes, user_answers_list: List[Optional[str]]) -> pd.DataFrame:
+    """
+    Har bir savol bo'yicha statistikani bitta vektorlashgan o'tishda hisoblaydi:
+    qiyinlik (to'g'ri javob berganlar foizi), farqlash indeksi (eng yaxshi va
+    eng past 27% ishtirokchilar orasidagi farq) va tanlangan harflar taqsimoti.
+    """
+    key = np.frombuffer(compiled_key, dtype=np.uint8)
+    question_numbers = np.flatnonzero(key != NO_ANSWER)
+    key_letters = key[question_numbers]
+    if not len(question_numbers) or not user_answers_list:
+        return pd.DataFrame()
+
+    # Ishtirokchilar × (faqat mavjud) savollar
+    answers = build_answer_matrix(user_answers_list, len(compiled_key))[:, question_numbers]
+    correct = answers == key_letters
+    participants, questions = answers.shape
+
+    difficulty = correct.mean(axis=0) * 100
+
+    group_size = max(1, int(round(participants * DISCRIMINATION_GROUP_SHARE)))
+    ranking = np.argsort(-correct.sum(axis=1), kind='stable')
+    discrimination = correct[ranking[:group_size]].mean(axis=0) - correct[ranking[-group_size:]].mean(axis=0)
+
+    # Harflar taqsimoti: (savol, harf kodi) juftliklarini bitta bincount bilan sanaymiz
+    flat_codes = (np.arange(questions, dtype=np.int64) * 256 + answers).ravel()
+    letter_counts = np.bincount(flat_codes, minlength=questions * 256).reshape(questions, 256)
+    used_codes = np.union1d(np.flatnonzero(letter_counts[:, 1:].sum(axis=0)) + 1, key_letters)
+
+    report = pd.DataFrame({
+        'Savol': question_numbers,
+        'To\'g\'ri javob': [chr(code).upper() for code in key_letters],
+        'Qiyinlik (% to\'g\'ri)': difficulty.round(1),
+        'Farqlash indeksi': discrimination.round(2),
+    })
+    for code in used_codes:
+        report[chr(code).upper()] = letter_counts[:, code]
+    report['Javobsiz'] = letter_counts[:, NO_ANSWER]
+    return report
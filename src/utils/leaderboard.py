@@ -0,0 +1,71 @@
+import asyncio
+import bisect
+import datetime
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+LEADERBOARD_CACHE_SIZE = 256  # Xotirada saqlanadigan testlar soni (LRU)
+
+
+class LeaderboardEntry(NamedTuple):
+    # Saralash kaliti: ko'p to'g'ri javob, so'ng ertaroq topshirgan oldinda
+    neg_correct: int
+    created_ts: float
+    result_id: int
+    user_id: int
+    correct: int
+    total: int
+
+
+class Leaderboard:
+    """Bitta test natijalarining doimo saralangan ro'yxati."""
+
+    def __init__(self):
+        self._entries: List[LeaderboardEntry] = []
+        self._result_ids = set()
+        self.version = 0  # Har bir o'zgarishda oshadi
+        self.loaded = asyncio.Event()
+
+    def add(self, result_id: int, user_id: int, correct: int, total: int, created_at: datetime.datetime):
+        if result_id in self._result_ids:
+            return
+        self._result_ids.add(result_id)
+        created_ts = created_at.timestamp() if created_at else 0.0
+        bisect.insort(self._entries, LeaderboardEntry(-correct, created_ts, result_id, user_id, correct, total))
+        self.version += 1
+
+    def top(self, count: int) -> List[LeaderboardEntry]:
+        return self._entries[:count]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_leaderboards: "OrderedDict[int, Leaderboard]" = OrderedDict()
+
+
+def get_cached_leaderboard(test_id: int) -> Optional[Leaderboard]:
+    board = _leaderboards.get(test_id)
+    if board is not None:
+        _leaderboards.move_to_end(test_id)
+    return board
+
+
+def create_leaderboard(test_id: int) -> Leaderboard:
+    board = _leaderboards[test_id] = Leaderboard()
+    _leaderboards.move_to_end(test_id)
+    while len(_leaderboards) > LEADERBOARD_CACHE_SIZE:
+        _leaderboards.popitem(last=False)
+    return board
+
+
+def record_result(test_id: int, result_id: int, user_id: int, correct: int, total: int,
+                  created_at: datetime.datetime):
+    """Yangi natijani (agar test keshda bo'lsa) reytingga qo'shadi. Keshda bo'lmasa — keyin bazadan quriladi."""
+    board = _leaderboards.get(test_id)
+    if board is not None:
+        board.add(result_id, user_id, correct, total, created_at)
+
+
+def drop_leaderboard(test_id: int):
+    _leaderboards.pop(test_id, None)
@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import functools
+import logging
+from datetime import timezone
+from typing import List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.outbox_data import (
+    OutboxMessage, enqueue_messages, get_pending_messages, mark_messages_sent, mark_messages_dead,
+    schedule_message_retries, delete_sent_messages_before
+)
+from src.utils.send_scheduler import send_scheduler, TelegramSendScheduler
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100  # Bir o'tishda bazadan olinadigan xabarlar soni
+OUTBOX_IDLE_INTERVAL = 5.0  # Navbat bo'sh bo'lsa qayta tekshirish oralig'i (soniya)
+OUTBOX_MAX_ATTEMPTS = 6  # Shuncha urinishdan keyin xabar "dead" bo'ladi
+OUTBOX_RETRY_BASE_DELAY = datetime.timedelta(seconds=15)  # Birinchi qayta urinishgacha, keyin 2x, 4x ...
+OUTBOX_RETRY_MAX_DELAY = datetime.timedelta(hours=1)
+OUTBOX_RETENTION = datetime.timedelta(days=7)  # Yuborilgan xabarlar shuncha vaqt saqlanadi
+OUTBOX_CLEANUP_EVERY = 500  # Har shuncha batchdan keyin eski yozuvlar tozalanadi
+
+
+class OutboxWorker:
+    """
+    `outbox` jadvalidagi navbatni batchlab yuboradi. Bot qayta ishga tushsa,
+    yuborilmagan xabarlar bazada qoladi va ish shu joydan davom etadi.
+    Yetkazish kamida bir marta kafolatlanadi: yuborish va belgilash orasida
+    jarayon to'xtasa, xabar qayta yuborilishi mumkin.
+    """
+
+    def __init__(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession],
+                 scheduler: TelegramSendScheduler = send_scheduler, batch_size: int = OUTBOX_BATCH_SIZE):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.scheduler = scheduler
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, messages: List[Tuple[int, str]], batch_key: Optional[str] = None,
+                      parse_mode: Optional[str] = 'HTML') -> int:
+        async with self.session_factory() as session:
+            count = await enqueue_messages(session, messages, batch_key=batch_key, parse_mode=parse_mode)
+        self.wake()
+        return count
+
+    def wake(self):
+        self._wakeup.set()
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run(), name="outbox_worker")
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        logger.info("Outbox worker started")
+        batches = 0
+        while True:
+            try:
+                delivered = await self._deliver_batch()
+                batches += 1
+                if batches % OUTBOX_CLEANUP_EVERY == 0:
+                    await self._cleanup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox worker xatosi: {e}", exc_info=True)
+                delivered = 0
+
+            if not delivered:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_IDLE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _deliver_batch(self) -> int:
+        async with self.session_factory() as session:
+            pending = await get_pending_messages(session, self.batch_size)
+        if not pending:
+            return 0
+
+        sent_ids = []
+        rejected_ids = []
+
+        async def _deliver(outbox_message: OutboxMessage):
+            try:
+                await self.bot.send_message(
+                    chat_id=outbox_message.chat_id,
+                    text=outbox_message.text,
+                    parse_mode=outbox_message.parse_mode
+                )
+            except (TelegramForbiddenError, TelegramBadRequest):
+                # Bot bloklangan yoki xabar yaroqsiz — qayta urinishdan foyda yo'q
+                rejected_ids.append(outbox_message.id)
+                raise
+            sent_ids.append(outbox_message.id)
+
+        await self.scheduler.send_many(
+            (outbox_message.chat_id, functools.partial(_deliver, outbox_message)) for outbox_message in pending
+        )
+        finished = set(sent_ids) | set(rejected_ids)
+        failed = [outbox_message for outbox_message in pending if outbox_message.id not in finished]
+
+        async with self.session_factory() as session:
+            await mark_messages_sent(session, sent_ids)
+            await mark_messages_dead(session, rejected_ids)
+            # Vaqtinchalik xatolar darhol emas, eksponensial kutishdan keyin qayta yuboriladi
+            dead = await schedule_message_retries(
+                session, failed, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE_DELAY, OUTBOX_RETRY_MAX_DELAY
+            )
+
+        logger.info(f"Outbox: {len(sent_ids)} ta yuborildi, {len(rejected_ids) + len(failed)} ta xato "
+                    f"({len(rejected_ids) + dead} tasi endi yuborilmaydi).")
+        return len(pending)
+
+    async def _cleanup(self):
+        async with self.session_factory() as session:
+            removed = await delete_sent_messages_before(
+                session, datetime.datetime.now(timezone.utc) - OUTBOX_RETENTION
+            )
+        if removed:
+            logger.info(f"Outbox: {removed} ta eski yozuv o'chirildi.")
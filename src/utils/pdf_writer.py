@@ -0,0 +1,197 @@
+import io
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PDF_DPI = 150.0  # Sahifa o'lchami piksel / DPI * 72 punkt
+PDF_PAGE_MAX_SIZE = (1240, 1754)  # A4 @ 150 dpi, piksel
+PDF_JPEG_QUALITY = 82  # JPEG siqish darajasi (vizual farq sezilmaydi)
+
+
+def encode_jpeg(img: Image.Image, quality: int = PDF_JPEG_QUALITY) -> bytes:
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def jpeg_size(jpeg_data: bytes) -> Tuple[int, int]:
+    """JPEG o'lchamini faqat sarlavhadan o'qiydi (rasm dekodlanmaydi)."""
+    with Image.open(io.BytesIO(jpeg_data)) as img:
+        return img.size
+
+
+class StreamingPdfWriter:
+    """
+    PDF faylini sahifama-sahifa yozadi: har bir sahifa (JPEG rasm) qo'shilishi
+    bilan diskka tushadi, xotirada faqat joriy sahifa turadi. Oxirida `close()`
+    sahifalar daraxti, xref jadvali va trailer'ni yozadi.
+    """
+
+    # 1 — Catalog, 2 — Pages (oxirida yoziladi); sahifa obyektlari 3 dan boshlanadi
+    _CATALOG_ID = 1
+    _PAGES_ID = 2
+
+    def __init__(self, path: str, dpi: float = PDF_DPI):
+        self.path = path
+        self.dpi = dpi
+        self._file = open(path, "wb")
+        self._offsets = {}
+        self._next_id = 3
+        self._page_ids: List[int] = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(self._CATALOG_ID, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    @property
+    def bytes_written(self) -> int:
+        return self._file.tell()
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+
+    def _allocate_id(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id: int, body: bytes, stream: Optional[bytes] = None):
+        self._offsets[obj_id] = self._file.tell()
+        self._write(f"{obj_id} 0 obj\n".encode())
+        self._write(body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_jpeg_page(self, jpeg_data: bytes, width: int, height: int):
+        """Tayyor JPEG baytlarini (RGB) alohida sahifa sifatida qo'shadi."""
+        image_id, content_id, page_id = self._allocate_id(), self._allocate_id(), self._allocate_id()
+        page_w = width * 72.0 / self.dpi
+        page_h = height * 72.0 / self.dpi
+
+        self._write_object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg_data)} >>"
+        ).encode(), jpeg_data)
+
+        content = f"q {page_w:.2f} 0 0 {page_h:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._write_object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent {self._PAGES_ID} 0 R /MediaBox [0 0 {page_w:.2f} {page_h:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self._page_ids.append(page_id)
+
+    def add_image(self, img: Image.Image, quality: int = PDF_JPEG_QUALITY):
+        self.add_jpeg_page(encode_jpeg(img, quality), img.width, img.height)
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+            self._write_object(self._PAGES_ID, (
+                f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>"
+            ).encode())
+
+            xref_offset = self._file.tell()
+            self._write(f"xref\n0 {self._next_id}\n".encode())
+            self._write(b"0000000000 65535 f \n")
+            for obj_id in range(1, self._next_id):
+                self._write(f"{self._offsets[obj_id]:010d} 00000 n \n".encode())
+            self._write((
+                f"trailer\n<< /Size {self._next_id} /Root {self._CATALOG_ID} 0 R >>\n"
+                f"startxref\n{xref_offset}\n%%EOF\n"
+            ).encode())
+        finally:
+            self._file.close()
+
+    def abort(self):
+        """Yozishni to'xtatadi (fayl chala qoladi — chaqiruvchi o'chiradi)."""
+        if not self._file.closed:
+            self._file.close()
+
+    def estimated_size_with(self, jpeg_size: int) -> int:
+        """Yana bitta sahifa qo'shib, hozir yopilsa fayl taxminan qancha bo'lishi."""
+        page_overhead = 1024  # Sahifa, kontent va rasm obyektlari sarlavhalari
+        tail = 512 + 20 * (self._next_id + 4) + 10 * (len(self._page_ids) + 1)  # Pages, xref, trailer
+        return self.bytes_written + jpeg_size + page_overhead + tail
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class MultiVolumePdfWriter:
+    """
+    Sahifalarni `StreamingPdfWriter` orqali yozadi va fayl `max_bytes` dan oshishidan
+    oldin yangi jildga o'tadi: "Sertifikatlar_12345.pdf" -> "..._part1.pdf", "..._part2.pdf".
+    Bitta jild bo'lsa, fayl nomi o'zgarmaydi.
+    """
+
+    def __init__(self, path: str, max_bytes: int, dpi: float = PDF_DPI):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self._base, self._ext = os.path.splitext(path)
+        self.volumes: List[str] = [path]
+        self.volume_page_counts: List[int] = []
+        self._writer = StreamingPdfWriter(path, dpi)
+
+    @property
+    def page_count(self) -> int:
+        return sum(self.volume_page_counts) + self._writer.page_count
+
+    def _volume_path(self, number: int) -> str:
+        return f"{self._base}_part{number}{self._ext}"
+
+    def _roll_over(self):
+        self._writer.close()
+        self.volume_page_counts.append(self._writer.page_count)
+        if len(self.volumes) == 1:
+            # Ikkinchi jild paydo bo'ldi — birinchisi ham "_part1" deb nomlanadi
+            first_path = self._volume_path(1)
+            os.replace(self.path, first_path)
+            self.volumes[0] = first_path
+        next_path = self._volume_path(len(self.volumes) + 1)
+        self.volumes.append(next_path)
+        self._writer = StreamingPdfWriter(next_path, self.dpi)
+        logger.info(f"PDF hajmi chegaraga yetdi, yangi jild boshlandi: {next_path}")
+
+    def add_jpeg_page(self, jpeg_data: bytes, width: int, height: int):
+        if self._writer.page_count and self._writer.estimated_size_with(len(jpeg_data)) > self.max_bytes:
+            self._roll_over()
+        self._writer.add_jpeg_page(jpeg_data, width, height)
+
+    def add_image(self, img: Image.Image, quality: int = PDF_JPEG_QUALITY):
+        self.add_jpeg_page(encode_jpeg(img, quality), img.width, img.height)
+
+    def close(self) -> List[str]:
+        """Oxirgi jildni yopadi va barcha jildlar yo'llarini qaytaradi."""
+        if not self._writer.closed:
+            self._writer.close()
+            self.volume_page_counts.append(self._writer.page_count)
+        return self.volumes
+
+    def abort(self):
+        self._writer.abort()
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.outbox_worker import OutboxWorker
+
+logger = logging.getLogger(__name__)
+
+DIGEST_INTERVAL = 30.0  # Birinchi natijadan keyin shuncha soniyada jamlanma yuboriladi
+DIGEST_MAX_RESULTS = 25  # ...yoki shuncha natija yig'ilganda darhol
+DIGEST_LIST_LIMIT = 10  # Jamlanmada ko'rsatiladigan ismlar soni
+
+
+@dataclass
+class _PendingDigest:
+    test_title: str
+    results: List[Tuple[str, int, int]] = field(default_factory=list)
+    timer: Optional[asyncio.Task] = None
+
+
+class ResultDigest:
+    """
+    Ijodkorga har bir natija uchun alohida "YANGI NATIJA" xabari o'rniga
+    (ijodkor, test) bo'yicha jamlangan xabarni har N soniyada yoki N natijada
+    bir marta yuboradi. Xabarlar outbox orqali ketadi.
+    """
+
+    def __init__(self, outbox: OutboxWorker, interval: float = DIGEST_INTERVAL,
+                 max_results: int = DIGEST_MAX_RESULTS):
+        self.outbox = outbox
+        self.interval = interval
+        self.max_results = max_results
+        self._pending: Dict[Tuple[int, int], _PendingDigest] = {}
+
+    async def add(self, creator_id: int, test_id: int, test_title: str, user_name: str, correct: int, total: int):
+        key = (creator_id, test_id)
+        digest = self._pending.get(key)
+        if digest is None:
+            digest = self._pending[key] = _PendingDigest(test_title=test_title)
+            digest.timer = asyncio.create_task(self._flush_later(key))
+        digest.results.append((user_name, correct, total))
+
+        if len(digest.results) >= self.max_results:
+            await self.flush(key)
+
+    async def _flush_later(self, key: Tuple[int, int]):
+        await asyncio.sleep(self.interval)
+        try:
+            await self.flush(key, from_timer=True)
+        except Exception as e:
+            logger.error(f"Natijalar jamlanmasini yuborishda xato {key}: {e}", exc_info=True)
+
+    async def flush(self, key: Tuple[int, int], from_timer: bool = False):
+        digest = self._pending.pop(key, None)
+        if digest is None:
+            return
+        if digest.timer and not from_timer:
+            digest.timer.cancel()
+
+        creator_id, test_id = key
+        await self.outbox.enqueue([(creator_id, format_digest_message(test_id, digest.test_title, digest.results))])
+
+    async def flush_all(self):
+        for key in list(self._pending):
+            await self.flush(key)
+
+
+def format_single_result_message(test_id: int, test_title: str, user_name: str, correct: int, total: int) -> str:
+    return (
+        f"<b> YANGI NATIJA </b> \n\n"
+        f"Test kodi: <i>{test_id}</i> \n\n"
+        f"Fan nomi: <i>{test_title}</i> \n\n"
+        f"<i>{user_name} - {correct}/{total}</i>"
+    )
+
+
+def format_digest_message(test_id: int, test_title: str, results: List[Tuple[str, int, int]]) -> str:
+    if len(results) == 1:
+        message = format_single_result_message(test_id, test_title, *results[0])
+    else:
+        best_name, best_correct, best_total = max(results, key=lambda r: r[1])
+        lines = [f"<i>{name} - {correct}/{total}</i>" for name, correct, total in results[:DIGEST_LIST_LIMIT]]
+        message = (
+            f"<b> YANGI NATIJALAR (+{len(results)} ta) </b> \n\n"
+            f"Test kodi: <i>{test_id}</i> \n"
+            f"Fan nomi: <i>{test_title}</i> \n"
+            f"🏅 Eng yaxshisi: <i>{best_name} - {best_correct}/{best_total}</i>\n\n"
+            + "\n".join(lines)
+        )
+        if len(results) > DIGEST_LIST_LIMIT:
+            message += f"\n... va yana {len(results) - DIGEST_LIST_LIMIT} kishi."
+
+    return message + f"\n\n🔔 Har bir natijani alohida olish: /each_result_{test_id}"
@@ -0,0 +1,118 @@
+import contextlib
+import glob
+import logging
+import os
+import shutil
+import uuid
+from typing import Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+TMPFS_ROOT = "/dev/shm"  # RAM'dagi fayl tizimi (mavjud bo'lsa va joy yetarli bo'lsa)
+DISK_SCRATCH_DIR = "scratch"
+SCRATCH_DIR_NAME = "test_checker_scratch"
+# Oldingi versiyalar qoldirgan vaqtinchalik fayllar — ishga tushishda tozalanadi
+LEGACY_SCRATCH_PATTERNS = ("temp_certs", "temp_certs_*", "reports/*.xlsx")
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class ScratchSpace:
+    """
+    Vaqtinchalik fayllar uchun boshqariladigan joy: har bir ish (sertifikatlar,
+    Excel hisobot) o'z papkasini oladi va ish tugashi yoki xato bilan to'xtashi
+    bilanoq papka o'chiriladi. Umumiy hajm `quota_bytes` dan oshsa, eng eski
+    tashlandiq papkalar o'chiriladi. Imkon bo'lsa tmpfs (/dev/shm) ishlatiladi.
+    """
+
+    def __init__(self, quota_bytes: int, root: Optional[str] = None):
+        self.quota_bytes = quota_bytes
+        # Berilgan papkaning o'zi emas, undagi alohida papka ishlatiladi: tozalash va kvota
+        # faqat bizning fayllarga tegadi (masalan, SCRATCH_DIR=/tmp bo'lsa ham)
+        base = root or self._choose_base(quota_bytes)
+        self.root = os.path.join(base, SCRATCH_DIR_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        self._active: Set[str] = set()
+        logger.info(f"Vaqtinchalik fayllar papkasi: {self.root} (kvota {quota_bytes // 1024 // 1024} MB)")
+
+    @staticmethod
+    def _choose_base(quota_bytes: int) -> str:
+        if os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+            # Docker'da /dev/shm odatda 64 MB — kvotaga sig'masa, diskdan foydalanamiz
+            if shutil.disk_usage(TMPFS_ROOT).free >= quota_bytes:
+                return TMPFS_ROOT
+        return os.path.abspath(DISK_SCRATCH_DIR)
+
+    @contextlib.contextmanager
+    def job_dir(self, name: str) -> Iterator[str]:
+        """Ish uchun alohida papka; `with` blokidan chiqishda (xato bo'lsa ham) o'chiriladi."""
+        self.enforce_quota()
+        path = os.path.join(self.root, f"{name}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(path)
+        self._active.add(path)
+        try:
+            yield path
+        finally:
+            self._active.discard(path)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def enforce_quota(self):
+        """Kvota oshgan bo'lsa, faol bo'lmagan eng eski yozuvlarni o'chiradi."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            try:
+                size = _dir_size(entry.path) if entry.is_dir() else entry.stat().st_size
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                # Boshqa ish shu orada o'z papkasini o'chirgan
+                continue
+            total += size
+            if entry.path not in self._active:
+                entries.append((mtime, size, entry.path))
+
+        if total <= self.quota_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= self.quota_bytes:
+                break
+            _remove(path)
+            total -= size
+            logger.warning(f"Kvota oshdi, eski vaqtinchalik papka o'chirildi: {path}")
+
+        if total > self.quota_bytes:
+            logger.warning(f"Faol ishlar kvotadan ko'p joy egallagan: {total // 1024 // 1024} MB")
+
+    def sweep_orphans(self):
+        """Ishga tushishda chaqiriladi: oldingi jarayondan qolgan barcha vaqtinchalik fayllarni o'chiradi."""
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.path not in self._active:
+                _remove(entry.path)
+                removed += 1
+        for pattern in LEGACY_SCRATCH_PATTERNS:
+            for path in glob.glob(pattern):
+                _remove(path)
+                removed += 1
+        if removed:
+            logger.info(f"Tashlandiq vaqtinchalik fayllar tozalandi: {removed} ta")
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_MESSAGES_PER_SECOND = 30  # Telegram: bot uchun umumiy ~30 xabar/soniya
+GLOBAL_BURST = 30
+PER_CHAT_INTERVAL = 1.0  # Bitta chatga ketma-ket xabarlar orasidagi minimal oraliq (soniya)
+MAX_SEND_ATTEMPTS = 3
+NETWORK_RETRY_DELAY = 1.0
+SEND_CONCURRENCY = 50  # send_many bir vaqtda kutadigan so'rovlar soni
+CHAT_STATE_LIMIT = 10000  # Xotirada saqlanadigan chatlar soni (eskilari tozalanadi)
+
+
+class TokenBucket:
+    """Oddiy token bucket: soniyasiga `rate` ta token, eng ko'pi `capacity` ta."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        # Lock navbatni adolatli (FIFO) qiladi
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class TelegramSendScheduler:
+    """
+    Jarayon bo'yicha yagona yuborish navbati. Barcha ommaviy yuborishlar shu
+    orqali o'tadi: umumiy token bucket (~30 xabar/s), har bir chat uchun alohida
+    oraliq, TelegramRetryAfter'ga rioya qilish va cheklangan qayta urinishlar.
+    """
+
+    def __init__(self, rate: float = GLOBAL_MESSAGES_PER_SECOND, burst: float = GLOBAL_BURST,
+                 per_chat_interval: float = PER_CHAT_INTERVAL):
+        self._bucket = TokenBucket(rate, burst)
+        self._per_chat_interval = per_chat_interval
+        self._chat_next_at: Dict[int, float] = {}
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+
+    def _chat_lock(self, chat_id: int) -> asyncio.Lock:
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            if len(self._chat_locks) >= CHAT_STATE_LIMIT:
+                self._prune()
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        return lock
+
+    def _prune(self):
+        now = time.monotonic()
+        for chat_id, lock in list(self._chat_locks.items()):
+            if not lock.locked() and self._chat_next_at.get(chat_id, 0) < now:
+                del self._chat_locks[chat_id]
+                self._chat_next_at.pop(chat_id, None)
+
+    async def send(self, chat_id: int, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        make_call() ni limitlarga rioya qilgan holda bajaradi. Flood/tarmoq
+        xatolarida MAX_SEND_ATTEMPTS martagacha qayta uradi, qolgan xatolar
+        (masalan, bot bloklangan) darhol yuqoriga uzatiladi.
+        """
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            async with self._chat_lock(chat_id):
+                wait = self._chat_next_at.get(chat_id, 0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self._bucket.acquire()
+
+                try:
+                    result = await make_call()
+                    self._chat_next_at[chat_id] = time.monotonic() + self._per_chat_interval
+                    return result
+                except TelegramRetryAfter as e:
+                    # Flood control: shu chatni ham, umumiy navbatni ham to'xtatib turamiz
+                    delay = e.retry_after
+                    self._chat_next_at[chat_id] = time.monotonic() + delay
+                    self._bucket.pause(delay)
+                    logger.warning(f"Flood control (chat {chat_id}): {delay}s kutiladi, urinish {attempt}")
+                    if attempt == MAX_SEND_ATTEMPTS:
+                        raise
+                except (TelegramNetworkError, TelegramServerError) as e:
+                    if attempt == MAX_SEND_ATTEMPTS:
+                        raise
+                    logger.warning(f"Yuborishda vaqtinchalik xato (chat {chat_id}), urinish {attempt}: {e}")
+                    await asyncio.sleep(NETWORK_RETRY_DELAY * attempt)
+
+    async def send_many(
+            self,
+            calls: Iterable[Tuple[int, Callable[[], Awaitable[Any]]]],
+            on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+    ) -> Tuple[int, int]:
+        """(chat_id, make_call) juftliklarini yuboradi. Qaytaradi: (yuborilgan, xato) soni."""
+        calls = list(calls)
+        total = len(calls)
+        sent = failed = done = 0
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+
+        async def _send_one(chat_id: int, make_call: Callable[[], Awaitable[Any]]):
+            nonlocal sent, failed, done
+            async with semaphore:
+                try:
+                    await self.send(chat_id, make_call)
+                    sent += 1
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Chat {chat_id} ga yuborib bo'lmadi: {type(e).__name__}: {e}")
+                done += 1
+                if on_progress:
+                    await on_progress(done, total)
+
+        await asyncio.gather(*(_send_one(chat_id, make_call) for chat_id, make_call in calls))
+        return sent, failed
+
+
+# Jarayon bo'yicha yagona nusxa — barcha handlerlar shu navbatdan foydalanadi
+send_scheduler = TelegramSendScheduler()
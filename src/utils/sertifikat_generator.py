@@ -1,13 +1,182 @@
 from PIL import Image, ImageDraw, ImageFont
+from collections import OrderedDict
+import copy
+import dataclasses
+import functools
 import os
 import uuid
 import logging
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from src.utils.pdf_writer import encode_jpeg, jpeg_size, PDF_PAGE_MAX_SIZE, PDF_JPEG_QUALITY
+from src.utils.cert_cache import certificate_cache_key, get_certificate_cache, render_fingerprint
+from src.utils.cert_registry import TemplateManifest, load_manifests
 
 # Loglarni sozlash
 logger = logging.getLogger(__name__)
 
+# Dekodlangan shablonlar uchun xotira chegarasi (bayt). Oshsa — eng kam ishlatilgani chiqariladi (LRU)
+TEMPLATE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+WORD_WIDTHS_CACHE_SIZE = 50_000  # (shrift, so'z) -> kenglik keshi chegarasi
+
+_word_widths_cache = {}
+_templates_cache: "OrderedDict[Tuple[str, float], Image.Image]" = OrderedDict()
+_templates_cache_bytes = 0
+_templates_lock = threading.Lock()
+
+
+class RenderProfile(NamedTuple):
+    name: str
+    max_size: Optional[Tuple[int, int]]  # None — shablonning asl o'lchami
+
+
+# Chizishdan oldin shablon, shrift va koordinatalar kerakli o'lchamga kichraytiriladi,
+# shuning uchun tuval hech qachon natijadan katta bo'lmaydi
+RENDER_PROFILE_PRINT = "print"
+RENDER_PROFILE_PDF = "pdf-a4-150dpi"
+RENDER_PROFILE_PREVIEW = "preview"
+RENDER_PROFILES = {
+    RENDER_PROFILE_PRINT: RenderProfile(RENDER_PROFILE_PRINT, None),
+    RENDER_PROFILE_PDF: RenderProfile(RENDER_PROFILE_PDF, PDF_PAGE_MAX_SIZE),
+    RENDER_PROFILE_PREVIEW: RenderProfile(RENDER_PROFILE_PREVIEW, (800, 800)),
+}
+
+# Rasm sifatida saqlash formatlari: kengaytma va Pillow parametrlari
+IMAGE_FORMATS = {
+    "png": ("png", "PNG", {"optimize": True}),
+    "jpeg": ("jpg", "JPEG", {"quality": 90}),
+    "webp": ("webp", "WEBP", {"quality": 90, "method": 4}),
+}
+
+
+def image_file_name(rank: int, image_format: str) -> str:
+    return f"cert_{rank}.{IMAGE_FORMATS[image_format][0]}"
+
+
+def save_image(img: Image.Image, path_without_ext: str, image_format: str) -> str:
+    extension, pil_format, options = IMAGE_FORMATS[image_format]
+    if pil_format == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    path = f"{path_without_ext}.{extension}"
+    img.save(path, pil_format, **options)
+    return path
+
+
+BASE_LAYER_CACHE_SIZE = 4  # Bir vaqtda ishlov berilayotgan partiyalar (fan, ustoz) soni
+_base_layers_cache: "OrderedDict[tuple, BaseLayer]" = OrderedDict()
+_base_layers_lock = threading.Lock()
+
+
+def _image_nbytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+@functools.lru_cache(maxsize=None)
+def get_template_size(template_file: str) -> Tuple[int, int]:
+    """Shablon o'lchami — faqat fayl sarlavhasidan o'qiladi."""
+    with Image.open(template_file) as opened:
+        return opened.size
+
+
+def get_template_image(template_file: str, scale: float = 1.0) -> Image.Image:
+    """
+    Shablonni bir marta dekodlab (kerak bo'lsa `scale` marta kichraytirib) xotirada
+    saqlaydi va har bir chizish uchun uning nusxasini (Image.copy) qaytaradi.
+    Asl rasm hech qachon o'zgartirilmaydi.
+    """
+    global _templates_cache_bytes
+    cache_key = (template_file, scale)
+    with _templates_lock:
+        template = _templates_cache.get(cache_key)
+        if template is not None:
+            _templates_cache.move_to_end(cache_key)
+            return template.copy()
+
+    with Image.open(template_file) as opened:
+        opened.load()
+        if scale < 1.0:
+            template = opened.resize(
+                (max(1, round(opened.width * scale)), max(1, round(opened.height * scale))), Image.LANCZOS
+            )
+        else:
+            template = opened.copy()
+
+    with _templates_lock:
+        if cache_key not in _templates_cache:
+            _templates_cache[cache_key] = template
+            _templates_cache_bytes += _image_nbytes(template)
+            # Eng kam ishlatilganlarini chiqaramiz, lekin hozirgisini qoldiramiz
+            while _templates_cache_bytes > TEMPLATE_CACHE_MAX_BYTES and len(_templates_cache) > 1:
+                _, evicted = _templates_cache.popitem(last=False)
+                _templates_cache_bytes -= _image_nbytes(evicted)
+        template = _templates_cache[cache_key]
+        _templates_cache.move_to_end(cache_key)
+        return template.copy()
+
+
+def clear_template_cache():
+    global _templates_cache_bytes
+    with _templates_lock:
+        _templates_cache.clear()
+        _templates_cache_bytes = 0
+    with _base_layers_lock:
+        _base_layers_cache.clear()
+
+
+class BaseLayer(NamedTuple):
+    image: Image.Image  # Shablon + ustoz ismi + tabrik matnining o'zgarmas satrlari
+    congrats_y: int  # Ishtirokchiga bog'liq satrlar shu balandlikdan boshlanadi
+    congrats_carry: str  # O'zgarmas qismning yopilmagan oxirgi satri
+
+
 class BaseCertificateGenerator:
     _fonts_cache = {}
+    _scale = 1.0  # Shablon va koordinatalar asl o'lchamga nisbatan shuncha marta kichraytirilgan
+
+    def profile_scale(self, profile: str) -> float:
+        max_size = RENDER_PROFILES[profile].max_size
+        if not max_size:
+            return 1.0
+        width, height = get_template_size(self.TEMPLATE_FILE)
+        return round(min(1.0, max_size[0] / width, max_size[1] / height), 4)
+
+    def scaled(self, scale: float) -> "BaseCertificateGenerator":
+        """Shrift o'lchamlari va koordinatalari `scale` ga ko'paytirilgan nusxa (keshlanadi)."""
+        if scale >= 1.0:
+            return self
+        scaled_generators = self.__dict__.setdefault("_scaled_generators", {})
+        generator = scaled_generators.get(scale)
+        if generator is None:
+            generator = copy.copy(self)
+            generator._scaled_generators = {}
+            generator._scale = scale
+
+            def _px(value):
+                return max(1, round(value * scale))
+
+            generator.STUDENT_FONT_SIZE = _px(self.STUDENT_FONT_SIZE)
+            generator.STUDENT_POSITION_Y = _px(self.STUDENT_POSITION_Y)
+            generator.TEACHER_FONT_SIZE = _px(self.TEACHER_FONT_SIZE)
+            generator.TEACHER_POSITION_XY = tuple(_px(value) for value in self.TEACHER_POSITION_XY)
+            generator.CONGRATS_FONT_SIZE = _px(self.CONGRATS_FONT_SIZE)
+            generator.CONGRATS_POSITION_Y = _px(self.CONGRATS_POSITION_Y)
+            generator.CONGRATS_MAX_WIDTH = _px(self.CONGRATS_MAX_WIDTH)
+            generator.LINE_SPACING = _px(self.LINE_SPACING)
+            scaled_generators[scale] = generator
+        return generator
+
+    def render_settings(self) -> Dict[str, object]:
+        """Chizishni belgilovchi sozlamalar: barcha KATTA_HARFLI atributlar (fayllar, o'lcham, rang, koordinata)."""
+        return {name: getattr(self, name) for name in dir(self) if name.isupper()}
+
+    def render_files(self) -> List[str]:
+        return [self.TEMPLATE_FILE, self.STUDENT_FONT_FILE, self.TEACHER_FONT_FILE, self.CONGRATS_FONT_FILE]
+
+    def render_fingerprint(self) -> str:
+        return render_fingerprint(self.render_settings(), self.render_files())
 
     def _get_font(self, font_path, size):
         cache_key = f"{font_path}_{size}"
@@ -19,290 +188,294 @@ class BaseCertificateGenerator:
                 self._fonts_cache[cache_key] = ImageFont.load_default()
         return self._fonts_cache[cache_key]
 
-    def _wrap_and_center_text(self, draw, text, font, img_width, max_width, start_y, line_spacing, fill_color):
-        words = text.split()
-        wrapped_lines = []
-        current_line = []
-
-        for word in words:
-            line_bbox = draw.textbbox((0, 0), ' '.join(current_line + [word]), font=font)
-            line_width = line_bbox[2] - line_bbox[0]
-
-            if line_width <= max_width:
-                current_line.append(word)
+    def _word_width(self, font, word) -> float:
+        # Shriftlar _fonts_cache'da umrbod saqlanadi, shuning uchun id(font) barqaror kalit
+        cache_key = (id(font), word)
+        width = _word_widths_cache.get(cache_key)
+        if width is None:
+            if len(_word_widths_cache) >= WORD_WIDTHS_CACHE_SIZE:
+                _word_widths_cache.clear()
+            width = _word_widths_cache[cache_key] = font.getlength(word)
+        return width
+
+    def _layout_lines(self, text, font, max_width) -> List[Tuple[str, float]]:
+        """
+        Matnni so'zlar bo'yicha satrlarga ajratadi: har bir so'z bir marta o'lchanadi
+        (kesh), satr kengligi esa yig'indi sifatida hisoblanadi. Qaytaradi: [(satr, kenglik)].
+        """
+        space_width = self._word_width(font, ' ')
+        lines = []
+        current_words = []
+        current_width = 0.0
+
+        for word in text.split():
+            word_width = self._word_width(font, word)
+            candidate_width = current_width + space_width + word_width if current_words else word_width
+
+            if candidate_width <= max_width or not current_words:
+                current_words.append(word)
+                current_width = candidate_width
             else:
-                if current_line:
-                    wrapped_lines.append(' '.join(current_line))
-                current_line = [word]
+                lines.append((' '.join(current_words), current_width))
+                current_words = [word]
+                current_width = word_width
 
-        if current_line:
-            wrapped_lines.append(' '.join(current_line))
+        if current_words:
+            lines.append((' '.join(current_words), current_width))
+        return lines
 
+    def _wrap_and_center_text(self, draw, text, font, img_width, max_width, start_y, line_spacing, fill_color):
         current_y = start_y
-        for line in wrapped_lines:
-            if not line: continue
-            line_bbox = draw.textbbox((0, 0), line, font=font)
-            line_width = line_bbox[2] - line_bbox[0]
+        for line, line_width in self._layout_lines(text, font, max_width):
             center_x = (img_width - line_width) / 2
             draw.text((center_x, current_y), line, fill=fill_color, font=font)
             current_y += line_spacing
 
-    def generate_certificate(self, full_name, subject, result_percent, rank, teacher_name, output_name):
+    def _congrats_parts(self, subject, result_percent, rank, teacher_name) -> Tuple[str, str]:
+        """Tabrik matni: (partiya uchun o'zgarmas boshi, ishtirokchiga bog'liq qolgani)."""
+        stable_text = f"Telegram kanalimiz orqali {subject} fanidan o`tkazilgan testimizdan"
+        variable_text = (
+            f"{result_percent}% natija ko'rsatgani uchun {teacher_name} tomonidan "
+            f"{rank}-o'rin bilan taqdirlandi"
+        )
+        return stable_text, variable_text
+
+    def _build_base_layer(self, subject, teacher_name) -> BaseLayer:
+        img = get_template_image(self.TEMPLATE_FILE, self._scale)
+        draw = ImageDraw.Draw(img)
+        img_width, _ = img.size
+
+        # Ustoz ismi chizish
+        teacher_font = self._get_font(self.TEACHER_FONT_FILE, self.TEACHER_FONT_SIZE)
+        draw.text(self.TEACHER_POSITION_XY, teacher_name, fill=self.TEACHER_TEXT_COLOR, font=teacher_font)
+
+        # Tabrik matnining o'zgarmas boshidan to'liq yopilgan satrlar hamma uchun bir xil:
+        # oxirgi satr esa keyingi so'zlarga bog'liq, u ishtirokchi matni bilan birga chiziladi
+        congrats_font = self._get_font(self.CONGRATS_FONT_FILE, self.CONGRATS_FONT_SIZE)
+        stable_text, _ = self._congrats_parts(subject, 0, 0, teacher_name)
+        stable_lines = self._layout_lines(stable_text, congrats_font, self.CONGRATS_MAX_WIDTH)
+        current_y = self.CONGRATS_POSITION_Y
+        for line, line_width in stable_lines[:-1]:
+            draw.text(((img_width - line_width) / 2, current_y), line, fill=self.CONGRATS_TEXT_COLOR,
+                      font=congrats_font)
+            current_y += self.LINE_SPACING
+
+        carry_text = stable_lines[-1][0] if stable_lines else ""
+        return BaseLayer(image=img, congrats_y=current_y, congrats_carry=carry_text)
+
+    def get_base_layer(self, subject, teacher_name) -> BaseLayer:
+        """
+        Partiya uchun umumiy qatlam: shablon, ustoz ismi va tabrik matnining
+        o'zgarmas satrlari. Bir partiyada bir marta chiziladi.
+        """
+        cache_key = (self.TEMPLATE_FILE, self._scale, subject, teacher_name)
+        with _base_layers_lock:
+            base = _base_layers_cache.get(cache_key)
+            if base is not None:
+                _base_layers_cache.move_to_end(cache_key)
+                return base
+
+        base = self._build_base_layer(subject, teacher_name)
+        with _base_layers_lock:
+            _base_layers_cache[cache_key] = base
+            while len(_base_layers_cache) > BASE_LAYER_CACHE_SIZE:
+                _base_layers_cache.popitem(last=False)
+        return base
+
+    def render(self, full_name, subject, result_percent, rank, teacher_name,
+               profile: str = RENDER_PROFILE_PRINT) -> Image.Image:
+        scale = self.profile_scale(profile)
+        if scale < 1.0:
+            return self.scaled(scale).render(full_name, subject, result_percent, rank, teacher_name)
+
+        base = self.get_base_layer(subject, teacher_name)
+        img = base.image.copy()
+        draw = ImageDraw.Draw(img)
+        img_width, _ = img.size
+
+        # Ism chizish
+        student_font = self._get_font(self.STUDENT_FONT_FILE, self.STUDENT_FONT_SIZE)
+        text_bbox = draw.textbbox((0, 0), full_name, font=student_font)
+        text_width = text_bbox[2] - text_bbox[0]
+        student_position = ((img_width - text_width) / 2, self.STUDENT_POSITION_Y)
+        draw.text(student_position, full_name, fill=self.STUDENT_TEXT_COLOR, font=student_font)
+
+        # Tabrik matnining qolgan qismini chizish
+        _, variable_text = self._congrats_parts(subject, result_percent, rank, teacher_name)
+        congrats_font = self._get_font(self.CONGRATS_FONT_FILE, self.CONGRATS_FONT_SIZE)
+        self._wrap_and_center_text(
+            draw, f"{base.congrats_carry} {variable_text}", congrats_font, img_width,
+            self.CONGRATS_MAX_WIDTH, base.congrats_y,
+            self.LINE_SPACING, self.CONGRATS_TEXT_COLOR
+        )
+        return img
+
+    def generate_certificate(self, full_name, subject, result_percent, rank, teacher_name, output_name,
+                             profile: str = RENDER_PROFILE_PRINT, image_format: str = "png") -> str:
         try:
-            img = Image.open(self.TEMPLATE_FILE)
-            draw = ImageDraw.Draw(img)
-            img_width, _ = img.size
-
-            congrats_text_final = (
-                f"Telegram kanalimiz orqali {subject} fanidan o`tkazilgan "
-                f"testimizdan {result_percent}% natija ko'rsatgani uchun {teacher_name} tomonidan "
-                f"{rank}-o'rin bilan taqdirlandi"
-            )
+            img = self.render(full_name, subject, result_percent, rank, teacher_name, profile)
+            return save_image(img, output_name, image_format)
+        except Exception as e:
+            raise Exception(f"Sertifikat yaratishda xato: {e}")
 
-            # Ism chizish
-            student_font = self._get_font(self.STUDENT_FONT_FILE, self.STUDENT_FONT_SIZE)
-            text_bbox = draw.textbbox((0, 0), full_name, font=student_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            student_position = ((img_width - text_width) / 2, self.STUDENT_POSITION_Y)
-            draw.text(student_position, full_name, fill=self.STUDENT_TEXT_COLOR, font=student_font)
-
-            # Ustoz ismi chizish
-            teacher_font = self._get_font(self.TEACHER_FONT_FILE, self.TEACHER_FONT_SIZE)
-            draw.text(self.TEACHER_POSITION_XY, teacher_name, fill=self.TEACHER_TEXT_COLOR, font=teacher_font)
-
-            # Tabrik matni chizish
-            congrats_font = self._get_font(self.CONGRATS_FONT_FILE, self.CONGRATS_FONT_SIZE)
-            self._wrap_and_center_text(
-                draw, congrats_text_final, congrats_font, img_width,
-                self.CONGRATS_MAX_WIDTH, self.CONGRATS_POSITION_Y,
-                self.LINE_SPACING, self.CONGRATS_TEXT_COLOR
-            )
 
-            img.save(output_name, optimize=True, quality=80)
+class TemplateCertificateGenerator(BaseCertificateGenerator):
+    """Manifest asosidagi generator; shablon rasmi va shriftlar birinchi chizishda yuklanadi."""
+
+    def __init__(self, manifest: TemplateManifest):
+        self.manifest = manifest
+        self.TEMPLATE_FILE = manifest.template_file
+        self.STUDENT_FONT_FILE = manifest.student.font_file
+        self.STUDENT_FONT_SIZE = manifest.student.font_size
+        self.STUDENT_TEXT_COLOR = manifest.student.color
+        self.STUDENT_POSITION_Y = manifest.student_y
+        self.TEACHER_FONT_FILE = manifest.teacher.font_file
+        self.TEACHER_FONT_SIZE = manifest.teacher.font_size
+        self.TEACHER_TEXT_COLOR = manifest.teacher.color
+        self.TEACHER_POSITION_XY = manifest.teacher_xy
+        self.CONGRATS_FONT_FILE = manifest.congrats.font_file
+        self.CONGRATS_FONT_SIZE = manifest.congrats.font_size
+        self.CONGRATS_TEXT_COLOR = manifest.congrats.color
+        self.CONGRATS_POSITION_Y = manifest.congrats_y
+        self.CONGRATS_MAX_WIDTH = manifest.congrats_max_width
+        self.LINE_SPACING = manifest.line_spacing
+
+    def render_settings(self) -> Dict[str, object]:
+        # Manifestning o'zi kesh kalitiga kiradi: y/size/color/font tahrirlansa, eski sahifalar ishlatilmaydi.
+        # Nom va ko'rinish rasmi sertifikat piksellariga ta'sir qilmaydi
+        settings = dataclasses.asdict(self.manifest)
+        for name in ("id", "title", "preview_file"):
+            settings.pop(name)
+        return settings
+
+
+class GeneratorRegistry(Mapping):
+    """{shablon ID: generator} — generator faqat birinchi so'ralganda yaratiladi."""
+
+    def __init__(self, manifests: Dict[int, TemplateManifest]):
+        self.manifests = manifests
+        self._generators: Dict[int, TemplateCertificateGenerator] = {}
+
+    def __getitem__(self, generator_id: int) -> TemplateCertificateGenerator:
+        generator = self._generators.get(generator_id)
+        if generator is None:
+            generator = self._generators[generator_id] = TemplateCertificateGenerator(self.manifests[generator_id])
+        return generator
+
+    def __contains__(self, generator_id) -> bool:
+        return generator_id in self.manifests
+
+    def reset(self):
+        self._generators.clear()
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.manifests)
+
+    def __len__(self) -> int:
+        return len(self.manifests)
+
+
+# Shablonlar sertifikatlar/manifests/*.json fayllarida tasvirlangan va import paytida tekshiriladi.
+# Yangi shablon qo'shish uchun rasm, shrift va manifest faylini qo'shish kifoya.
+TEMPLATE_MANIFESTS = load_manifests()
+GENERATORS_POOL = GeneratorRegistry(TEMPLATE_MANIFESTS)
+
+
+def clear_render_caches():
+    """Jarayondagi barcha chizish keshlarini tozalaydi: shablonlar, asosiy qatlamlar, shriftlar, so'z kengliklari."""
+    clear_template_cache()
+    get_template_size.cache_clear()
+    BaseCertificateGenerator._fonts_cache.clear()
+    _word_widths_cache.clear()
+    # Masshtablangan nusxalar generator obyektlarida saqlanadi — generatorlar qayta yaratiladi
+    GENERATORS_POOL.reset()
+
+
+def warm_up_generators(generator_ids: Iterable[int], profiles: Iterable[str] = (RENDER_PROFILE_PDF,)) -> List[int]:
+    """
+    Berilgan generatorlarning shablon rasmlari va shriftlarini jarayon keshiga oldindan yuklaydi,
+    shunda birinchi partiya "sovuq" diskdan o'qilmaydi. Yuklangan generator ID'larini qaytaradi.
+    """
+    warmed = []
+    for generator_id in generator_ids:
+        generator = GENERATORS_POOL.get(generator_id)
+        if not generator:
+            continue
+        try:
+            for profile in profiles:
+                scaled = generator.scaled(generator.profile_scale(profile))
+                get_template_image(scaled.TEMPLATE_FILE, scaled._scale)
+                scaled._get_font(scaled.STUDENT_FONT_FILE, scaled.STUDENT_FONT_SIZE)
+                scaled._get_font(scaled.TEACHER_FONT_FILE, scaled.TEACHER_FONT_SIZE)
+                scaled._get_font(scaled.CONGRATS_FONT_FILE, scaled.CONGRATS_FONT_SIZE)
         except Exception as e:
-            raise Exception(f"Sertifikat yaratishda xato: {e}")
+            logger.warning(f"Generator {generator_id} ni oldindan yuklashda xato: {e}")
+            continue
+        warmed.append(generator_id)
+    return warmed
 
-# --- 1-dan 4-gacha bo'lgan eski generatorlar ---
-class CertificateGenerator1(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat1.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat1_ism.ttf"
-        self.STUDENT_FONT_SIZE = 100
-        self.STUDENT_TEXT_COLOR = "#865b34"
-        self.STUDENT_POSITION_Y = 550
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat1_matn.ttf"
-        self.TEACHER_FONT_SIZE = 40
-        self.TEACHER_TEXT_COLOR = "#865b34"
-        self.TEACHER_POSITION_XY = (1215, 1050)
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat1_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 30
-        self.CONGRATS_TEXT_COLOR = "black"
-        self.CONGRATS_POSITION_Y = 690
-        self.CONGRATS_MAX_WIDTH = 850
-        self.LINE_SPACING = 40
-
-class CertificateGenerator2(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat2.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat2_ism.otf"
-        self.STUDENT_FONT_SIZE = 100
-        self.STUDENT_TEXT_COLOR = "#543c19"
-        self.STUDENT_POSITION_Y = 550
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat2_teacher.ttf"
-        self.TEACHER_FONT_SIZE = 40
-        self.TEACHER_TEXT_COLOR = "#543c19"
-        self.TEACHER_POSITION_XY = (1100, 1150)
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat2_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 30
-        self.CONGRATS_TEXT_COLOR = "black"
-        self.CONGRATS_POSITION_Y = 700
-        self.CONGRATS_MAX_WIDTH = 850
-        self.LINE_SPACING = 40
-
-class CertificateGenerator3(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat3.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat3_ism.ttf"
-        self.STUDENT_FONT_SIZE = 100
-        self.STUDENT_TEXT_COLOR = "#b27409"
-        self.STUDENT_POSITION_Y = 650
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat3_teacher.ttf"
-        self.TEACHER_FONT_SIZE = 40
-        self.TEACHER_TEXT_COLOR = "#b27409"
-        self.TEACHER_POSITION_XY = (1100, 1058)
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat3_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 30
-        self.CONGRATS_TEXT_COLOR = "black"
-        self.CONGRATS_POSITION_Y = 770
-        self.CONGRATS_MAX_WIDTH = 850
-        self.LINE_SPACING = 40
-
-class CertificateGenerator4(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat4.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat4_ism.ttf"
-        self.STUDENT_FONT_SIZE = 100
-        self.STUDENT_TEXT_COLOR = "#b27409"
-        self.STUDENT_POSITION_Y = 530
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat4_matn.ttf"
-        self.TEACHER_FONT_SIZE = 40
-        self.TEACHER_TEXT_COLOR = "#a27430"
-        self.TEACHER_POSITION_XY = (1175, 1058)
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat4_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 30
-        self.CONGRATS_TEXT_COLOR = "#a27430"
-        self.CONGRATS_POSITION_Y = 680
-        self.CONGRATS_MAX_WIDTH = 850
-        self.LINE_SPACING = 40
-
-# --- 5, 6, 7 generatorlar (Siz bergan yangi koordinatalar bilan) ---
-class CertificateGenerator5(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat5.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat5_ism.ttf"
-        self.STUDENT_FONT_SIZE = 110
-        self.STUDENT_TEXT_COLOR = "#c17d2f"
-        self.STUDENT_POSITION_Y = 475
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat5_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 45
-        self.CONGRATS_TEXT_COLOR = "#444444"
-        self.CONGRATS_POSITION_Y = 620
-        self.CONGRATS_MAX_WIDTH = 1100
-        self.LINE_SPACING = 45
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat5_matn.ttf"
-        self.TEACHER_FONT_SIZE = 45
-        self.TEACHER_TEXT_COLOR = "#000000"
-        self.TEACHER_POSITION_XY = (1200, 1010)
-
-class CertificateGenerator6(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat6.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat6_ism.ttf"
-        self.STUDENT_FONT_SIZE = 110
-        self.STUDENT_TEXT_COLOR = "#c0944d"
-        self.STUDENT_POSITION_Y = 580
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat6_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 45
-        self.CONGRATS_TEXT_COLOR = "#444444"
-        self.CONGRATS_POSITION_Y = 720
-        self.CONGRATS_MAX_WIDTH = 1200
-        self.LINE_SPACING = 45
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat6_matn.ttf"
-        self.TEACHER_FONT_SIZE = 45
-        self.TEACHER_TEXT_COLOR = "#000000"
-        self.TEACHER_POSITION_XY = (1220, 1190)
-
-class CertificateGenerator7(BaseCertificateGenerator):
-    def __init__(self):
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat7.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat7_ism.ttf"
-        self.STUDENT_FONT_SIZE = 110
-        self.STUDENT_TEXT_COLOR = "#000000"
-        self.STUDENT_POSITION_Y = 1115
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat7_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 25
-        self.CONGRATS_TEXT_COLOR = "#000000"
-        self.CONGRATS_POSITION_Y = 1300
-        self.CONGRATS_MAX_WIDTH = 800
-        self.LINE_SPACING = 55
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat7_matn.ttf"
-        self.TEACHER_FONT_SIZE = 45
-        self.TEACHER_TEXT_COLOR = "#000000"
-        self.TEACHER_POSITION_XY = (855, 1720)
-
-class CertificateGenerator8(BaseCertificateGenerator):
-    def __init__(self):
-        # ⚠️ Bu yerda fayl nomlarini o'zingizdagi nomlarga moslab o'zgartiring
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat8.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat8_ism.ttf"
-        self.STUDENT_FONT_SIZE = 110
-        self.STUDENT_TEXT_COLOR = "#d9c179"
-        self.STUDENT_POSITION_Y = 500  # O'zgartirib ko'ring
-
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat8_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 45
-        self.CONGRATS_TEXT_COLOR = "#FFFFFF"
-        self.CONGRATS_POSITION_Y = 680 # O'zgartirib ko'ring
-        self.CONGRATS_MAX_WIDTH = 1200
-        self.LINE_SPACING = 45
-
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat8_matn.ttf"
-        self.TEACHER_FONT_SIZE = 45
-        self.TEACHER_TEXT_COLOR = "#FFFFFF"
-        self.TEACHER_POSITION_XY = (1370, 1090) # (X, Y) kordinatasi
-
-class CertificateGenerator9(BaseCertificateGenerator):
-    def __init__(self):
-        # ⚠️ Bu yerda fayl nomlarini o'zingizdagi nomlarga moslab o'zgartiring
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat9.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat9_ism.ttf"
-        self.STUDENT_FONT_SIZE = 110
-        self.STUDENT_TEXT_COLOR = "#b97733"
-        self.STUDENT_POSITION_Y = 500  # O'zgartirib ko'ring
-
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat9_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 45
-        self.CONGRATS_TEXT_COLOR = "#540807"
-        self.CONGRATS_POSITION_Y = 650 # O'zgartirib ko'ring
-        self.CONGRATS_MAX_WIDTH = 1200
-        self.LINE_SPACING = 45
-
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat9_matn.ttf"
-        self.TEACHER_FONT_SIZE = 45
-        self.TEACHER_TEXT_COLOR = "#540807"
-        self.TEACHER_POSITION_XY = (1290, 1180) # (X, Y) kordinatasi
-
-class CertificateGenerator10(BaseCertificateGenerator):
-    def __init__(self):
-        # ⚠️ Bu yerda fayl nomlarini o'zingizdagi nomlarga moslab o'zgartiring
-        self.TEMPLATE_FILE = "sertifikatlar/sertifikat10.png"
-        self.STUDENT_FONT_FILE = "sertifikatlar/sertifikat10_ism.ttf"
-        self.STUDENT_FONT_SIZE = 110
-        self.STUDENT_TEXT_COLOR = "#FFFFFF"
-        self.STUDENT_POSITION_Y = 580  # O'zgartirib ko'ring
-
-        self.CONGRATS_FONT_FILE = "sertifikatlar/sertifikat9_matn.ttf"
-        self.CONGRATS_FONT_SIZE = 45
-        self.CONGRATS_TEXT_COLOR = "#FFFFFF"
-        self.CONGRATS_POSITION_Y = 710 # O'zgartirib ko'ring
-        self.CONGRATS_MAX_WIDTH = 1200
-        self.LINE_SPACING = 45
-
-        self.TEACHER_FONT_FILE = "sertifikatlar/sertifikat9_matn.ttf"
-        self.TEACHER_FONT_SIZE = 45
-        self.TEACHER_TEXT_COLOR = "#FFFFFF"
-        self.TEACHER_POSITION_XY = (1320, 1160) # (X, Y) kordinatasi
-
-GENERATORS_POOL = {
-    1: CertificateGenerator1(),
-    2: CertificateGenerator2(),
-    3: CertificateGenerator3(),
-    4: CertificateGenerator4(),
-    5: CertificateGenerator5(),
-    6: CertificateGenerator6(),
-    7: CertificateGenerator7(),
-    8: CertificateGenerator8(),
-    9: CertificateGenerator9(),
-    10: CertificateGenerator10()
-}
 
 def create_certificate(generator_id: int, full_name: str, subject: str,
-                       result_percent: float, rank: int, teacher_name: str) -> str:
-    OUTPUT_DIR = "temp_certs"
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    output_filename = os.path.join(OUTPUT_DIR, f"cert_{rank}_{uuid.uuid4().hex[:5]}.png")
+                       result_percent: float, rank: int, teacher_name: str, output_dir: str,
+                       profile: str = RENDER_PROFILE_PRINT, image_format: str = "png") -> str:
+    """Sertifikatni rasm (PNG / JPEG / WebP) sifatida `output_dir` ga yozadi; papkani tozalash chaqiruvchining vazifasi."""
+    os.makedirs(output_dir, exist_ok=True)
+    output_name = os.path.join(output_dir, f"cert_{rank}_{uuid.uuid4().hex[:5]}")
 
     try:
         generator = GENERATORS_POOL.get(generator_id)
         if not generator:
             return "❌ Noto'g'ri generator ID."
 
-        generator.generate_certificate(
+        return generator.generate_certificate(
             full_name=full_name, subject=subject,
             result_percent=result_percent, rank=rank,
-            teacher_name=teacher_name, output_name=output_filename
+            teacher_name=teacher_name, output_name=output_name,
+            profile=profile, image_format=image_format
         )
-        return output_filename
     except Exception as e:
         logger.error(f"Sertifikat generatsiyasida xato: {e}")
-        return f"❌ Xato: {e}"
\ No newline at end of file
+        return f"❌ Xato: {e}"
+
+
+def render_certificate_page(generator_id: int, full_name: str, subject: str, result_percent: float, rank: int,
+                            teacher_name: str, image_output_dir: Optional[str] = None,
+                            image_format: str = "png") -> Union[Tuple[bytes, int, int], str]:
+    """
+    Sertifikatni xotirada "pdf-a4-150dpi" profilida chizadi va PDF sahifasi uchun tayyor
+    JPEG baytlarini qaytaradi: (jpeg, kenglik, balandlik). Sozlangan bo'lsa, sahifa
+    sertifikat keshiga yoziladi va bir xil kirish ma'lumotlari uchun qayta chizilmaydi.
+    `image_output_dir` berilsa, qo'shimcha ravishda asl o'lchamdagi rasm nusxasi saqlanadi.
+    """
+    try:
+        generator = GENERATORS_POOL.get(generator_id)
+        if not generator:
+            return "❌ Noto'g'ri generator ID."
+
+        # Rasm nusxasi so'ralmagan bo'lsa, avval tayyor sahifa keshdan qidiriladi
+        cache = get_certificate_cache()
+        cache_key = None
+        if cache and not image_output_dir:
+            cache_key = certificate_cache_key(generator_id, generator.render_fingerprint(), full_name, subject,
+                                              result_percent, rank, teacher_name, RENDER_PROFILES[RENDER_PROFILE_PDF],
+                                              generator.profile_scale(RENDER_PROFILE_PDF), PDF_JPEG_QUALITY)
+            cached_page = cache.get(cache_key)
+            if cached_page:
+                return (cached_page, *jpeg_size(cached_page))
+
+        if image_output_dir:
+            # Nusxa chop etish uchun asl o'lchamda chiziladi, sahifa esa undan kichraytiriladi
+            img = generator.render(full_name, subject, result_percent, rank, teacher_name, RENDER_PROFILE_PRINT)
+            os.makedirs(image_output_dir, exist_ok=True)
+            save_image(img, os.path.join(image_output_dir, f"cert_{rank}"), image_format)
+        else:
+            img = generator.render(full_name, subject, result_percent, rank, teacher_name, RENDER_PROFILE_PDF)
+
+        img.thumbnail(PDF_PAGE_MAX_SIZE, Image.LANCZOS)
+        page = encode_jpeg(img)
+        if cache_key:
+            cache.put(cache_key, page)
+        return page, img.width, img.height
+    except Exception as e:
+        logger.error(f"Sertifikat generatsiyasida xato: {e}")
+        return f"❌ Xato: {e}"